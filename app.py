@@ -1,44 +1,77 @@
 # app.py
-import os
-from flask import Flask, jsonify
+from datetime import timedelta
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
+from flask_login import login_required
 from flask_migrate import Migrate
-from models import db, login_manager, bcrypt
+from config import Config
+from models import db, login_manager
+from utils.cache import cache
+from utils.compression import compressor
+from utils.counters import reconcile
+from utils.engine import engine_options, install_pragmas
+from utils.events import events, HubFull
+from utils.sync import purge_tombstones
+from utils.hashing import hasher, HashingBusy
+from utils.identity import identities
+from utils.metrics import metrics
+from utils.purge import purger
+from utils.ranks import rebalancer
+from utils.replicas import replicas
+from utils import fastjson, search
 from auth import bp as auth_bp
 from routes.projects import bp as projects_bp
 from routes.tasks import bp as tasks_bp
 from routes.subtasks import bp as subtasks_bp
+from routes.search import bp as search_bp
+from routes.agenda import bp as agenda_bp
+from routes.sync import bp as sync_bp
 
-def create_app():
+def create_app(profile=None):
+    # profile: one of config.ENGINE_PROFILES, else DB_PROFILE / picked from the URL
     app = Flask(__name__)
-    app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "devkey")
+    app.config.from_object(Config(profile))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
 
-    db_url = os.getenv("DATABASE_URL")
-    app.config["SQLALCHEMY_DATABASE_URI"] = (db_url or "sqlite:///app.db").replace(
-        "postgres://", "postgresql://", 1
-    )
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-    # cookies/CORS for local dev + tests
-    app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
-    app.config["SESSION_COOKIE_SECURE"] = False
+    # CORS for local dev + tests
     origins = [f"http://127.0.0.1:{p}" for p in (5173, 5174, 5175, 5176, 5177)] + \
               [f"http://localhost:{p}" for p in (5173, 5174, 5175, 5176, 5177)]
     CORS(app, resources={r"/*": {"origins": origins}}, supports_credentials=True)
 
     # init extensions
+    metrics.init_app(app)
+    fastjson.init_app(app)
+    replicas.init_app(app, db)  # adds the replica binds, so before db.init_app
     db.init_app(app)
-    bcrypt.init_app(app)
+    hasher.init_app(app)
     login_manager.init_app(app)
+    cache.init_app(app)
+    identities.init_app(app)
+    events.init_app(app)
+    purger.init_app(app)
+    rebalancer.init_app(app)
+    compressor.init_app(app)  # after metrics: its hook runs first, so "compress" is timed
 
     # return JSON 401 (no redirects/HTML)
     @login_manager.unauthorized_handler
     def _unauth():
         return jsonify(error="Unauthorized"), 401
 
+    @app.errorhandler(HashingBusy)
+    def _hashing_busy(e):
+        return jsonify(error="authentication is busy, retry shortly"), 503, {"Retry-After": "1"}
+
+    @app.errorhandler(HubFull)
+    def _events_full(e):
+        return jsonify(error="too many open event streams, retry shortly"), 503, {"Retry-After": "5"}
+
     # **critical**: ensure tables match models (sidestep busted Alembic state)
     with app.app_context():
+        for engine in db.engines.values():
+            install_pragmas(engine, app.config)
+            metrics.instrument(engine)
         db.create_all()
+        search.install(db.engine)
 
     
     Migrate(app, db)
@@ -48,11 +81,59 @@ def create_app():
     app.register_blueprint(projects_bp, url_prefix="/projects")
     app.register_blueprint(tasks_bp, url_prefix="/tasks")
     app.register_blueprint(subtasks_bp, url_prefix="/subtasks")
+    app.register_blueprint(search_bp, url_prefix="/search")
+    app.register_blueprint(agenda_bp, url_prefix="/agenda")
+    app.register_blueprint(sync_bp, url_prefix="/sync")
 
     @app.get("/health")
     def health():
         return jsonify(ok=True), 200
 
+    @app.cli.command("reconcile-counters")
+    def reconcile_counters():
+        """Recompute project/task progress counters from the rows (GROUP BY)."""
+        print(f"fixed {reconcile()} row(s)")
+
+    @app.cli.command("search-reindex")
+    def search_reindex():
+        """Rebuild the full-text search index from the projects/tasks/subtasks tables."""
+        search.rebuild(db.engine)
+        print("search index rebuilt")
+
+    @app.cli.command("purge-tombstones")
+    def purge_old_tombstones():
+        """Delete sync tombstones older than SYNC_TOMBSTONE_DAYS."""
+        n = purge_tombstones(timedelta(days=app.config["SYNC_TOMBSTONE_DAYS"]))
+        print(f"purged {n} tombstone(s)")
+
+    @app.cli.command("purge-projects")
+    def purge_projects():
+        """Finish purging soft-deleted projects (a restart stops the background purge)."""
+        for project_id in purger.pending():
+            print(f"project {project_id}: purged {purger.purge(project_id)} task(s)")
+
+    @app.cli.command("replica-sync")
+    def replica_sync():
+        """Copy the primary SQLite database over the replica files (local testing)."""
+        for path in replicas.sync_sqlite():
+            print(f"synced {path}")
+
+    @app.get("/cache/stats")
+    @login_required
+    def cache_stats():
+        return jsonify(cache.stats()), 200
+
+    if app.config["METRICS_ENDPOINT"]:
+        # off by default: a Prometheus scraper can't log in, so this is for private networks only
+        @app.get("/metrics")
+        def prometheus_metrics():
+            return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/events/stats")
+    @login_required
+    def events_stats():
+        return jsonify(events.stats()), 200
+
     return app
 
 app = create_app()
\ No newline at end of file
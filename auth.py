@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
 from models import db, User
+from utils.hashing import password_too_long, MAX_PASSWORD_BYTES
 
 bp = Blueprint("auth", __name__)
 
@@ -14,6 +15,8 @@ def signup():
 
     if not username or not email or not password:
         return jsonify(error="username, email, and password are required"), 400
+    if password_too_long(password):
+        return jsonify(error=f"password must be at most {MAX_PASSWORD_BYTES} bytes"), 400
 
     if User.query.filter((User.username == username) | (User.email == email)).first():
         return jsonify(error="username or email already in use"), 400
@@ -33,10 +36,16 @@ def login():
     password = data.get("password") or ""
     if not email or not password:
         return jsonify(error="email and password are required"), 400
+    if password_too_long(password):
+        return jsonify(error=f"password must be at most {MAX_PASSWORD_BYTES} bytes"), 400
 
     u = User.query.filter_by(email=email).first()
     if not u or not u.check_password(password):
         return jsonify(error="invalid credentials"), 401
+    if u.password_needs_rehash():
+        # work factor changed since this hash was made; upgrade it while we have the password
+        u.set_password(password)
+        db.session.commit()
 
     login_user(u)
     return jsonify(user=u.to_dict()), 200
@@ -38,6 +38,10 @@ export const auth = {
 export const projects = {
   list: () => request("/projects"),
   get: (id) => request(`/projects/${id}`),
+  tree: ({ projectId, page = 1, perPage = 10, status = "all", sort = "due_date" }) =>
+    request(
+      `/projects/${projectId}/tree?page=${page}&per_page=${perPage}&status=${status}&sort=${sort}`
+    ),
   create: (title, description = "") =>
     request("/projects", { method: "POST", body: { title, description } }),
   remove: (id) => request(`/projects/${id}`, { method: "DELETE" }),
@@ -29,30 +29,23 @@ export default function ProjectDetail() {
   const [subs, setSubs] = useState({});
   const [error, setError] = useState("");
 
-  async function loadProject() {
-    try {
-      const data = await projectsApi.get(pid);
-      setProject(data);
-    } catch (e) {
-      setError(e.message);
-    }
-  }
-
   async function loadTasks() {
     setError("");
     try {
-      const resp = await tasks.list({
+      // one request for the project, the task page and every task's subtasks
+      const resp = await projectsApi.tree({
         projectId: pid,
         page,
         perPage,
         status: filterStatus,
         sort: "due_date",
       });
-      setRows(resp.data);
+      setProject(resp.project);
+      setRows(resp.tasks);
       setMeta(resp.meta);
       const all = {};
-      for (const t of resp.data) {
-        all[t.id] = await subtasks.list(t.id);
+      for (const t of resp.tasks) {
+        all[t.id] = t.subtasks;
       }
       setSubs(all);
     } catch (e) {
@@ -65,7 +58,7 @@ export default function ProjectDetail() {
       try {
         await refresh();
       } catch {}
-      await Promise.all([loadProject(), loadTasks()]);
+      await loadTasks();
     })();
   }, [pid, page, perPage, filterStatus]);
 
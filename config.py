@@ -1,20 +1,131 @@
 # config.py
+# Settings are read from the environment when an app is created
+# (create_app() -> Config()), not at import time, so scripts and tests can
+# change env vars between apps.
 import os
 
+# Named database engine profiles (DB_PROFILE). Each setting can still be
+# overridden by its own env var, e.g. DB_PROFILE=postgres-prod DB_POOL_SIZE=40.
+ENGINE_PROFILES = {
+    # driver defaults (SQLite: rollback journal, readers wait on writers)
+    "dev": {},
+    # WAL lets readers run alongside the single writer; synchronous=NORMAL is
+    # still crash-safe for the app, only an OS crash can lose the last commits
+    "sqlite-wal": {
+        "SQLITE_JOURNAL_MODE": "wal",
+        "SQLITE_SYNCHRONOUS": "normal",
+        "SQLITE_BUSY_TIMEOUT": 5000,              # ms to wait for the write lock
+        "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+        "SQLITE_CACHE_SIZE": -64000,              # negative = KiB per connection
+        "DB_POOL_SIZE": 8,
+        "DB_MAX_OVERFLOW": 8,
+    },
+    "postgres-prod": {
+        "DB_POOL_SIZE": 10,
+        "DB_MAX_OVERFLOW": 20,
+        "DB_POOL_TIMEOUT": 10,
+        "DB_POOL_RECYCLE": 1800,                  # under typical proxy/LB idle cutoffs
+        "DB_POOL_PRE_PING": True,
+        "DB_STATEMENT_TIMEOUT": 15000,            # ms
+    },
+}
+
+ENGINE_SETTINGS = {
+    "SQLITE_JOURNAL_MODE": str,
+    "SQLITE_SYNCHRONOUS": str,
+    "SQLITE_BUSY_TIMEOUT": int,
+    "SQLITE_MMAP_SIZE": int,
+    "SQLITE_CACHE_SIZE": int,
+    "DB_POOL_SIZE": int,
+    "DB_MAX_OVERFLOW": int,
+    "DB_POOL_TIMEOUT": float,
+    "DB_POOL_RECYCLE": int,
+    "DB_POOL_PRE_PING": lambda v: v == "1",
+    "DB_STATEMENT_TIMEOUT": int,
+}
+
+
+def database_url() -> str:
+    return (os.getenv("DATABASE_URL") or "sqlite:///app.db").replace("postgres://", "postgresql://", 1)
+
+
 class Config:
-    SECRET_KEY = os.getenv("SECRET_KEY", "devkey")
-
-    # DB
-    db_url = os.getenv("DATABASE_URL")
-    if db_url:
-        
-        db_url = db_url.replace("postgres://", "postgresql://", 1)
-    SQLALCHEMY_DATABASE_URI = db_url or "sqlite:///app.db"
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-
-    
-    SESSION_COOKIE_SAMESITE = "Lax"
-    SESSION_COOKIE_SECURE = False
-
-    # Flask
-    JSON_SORT_KEYS = False
\ No newline at end of file
+    def __init__(self, profile=None):
+        self.SECRET_KEY = os.getenv("SECRET_KEY", "devkey")
+
+        # DB
+        self.SQLALCHEMY_DATABASE_URI = database_url()
+        self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+        default = "sqlite-wal" if self.SQLALCHEMY_DATABASE_URI.startswith("sqlite") else "postgres-prod"
+        self.DB_PROFILE = profile or os.getenv("DB_PROFILE") or default
+        if self.DB_PROFILE not in ENGINE_PROFILES:
+            raise ValueError(f"unknown DB_PROFILE {self.DB_PROFILE!r}")
+        for name, cast in ENGINE_SETTINGS.items():
+            raw = os.getenv(name)
+            setattr(self, name, cast(raw) if raw else ENGINE_PROFILES[self.DB_PROFILE].get(name))
+
+        # optional read replicas (comma-separated URLs) for GET requests; a client
+        # that wrote reads from the primary for REPLICA_LAG_TOLERANCE seconds
+        self.DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+        self.REPLICA_LAG_TOLERANCE = float(os.getenv("REPLICA_LAG_TOLERANCE", "5"))
+
+        # read cache for list endpoints ("lru" in-process, "none" to disable)
+        self.CACHE_BACKEND = os.getenv("CACHE_BACKEND", "lru")
+        self.CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+        self.CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+
+        # password hashing: bcrypt cost + bounded worker pool (full backlog -> 503)
+        self.BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
+        self.HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+        self.HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "16"))
+        self.HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+
+        # user_loader identity cache (0 = load the User row on every request)
+        self.IDENTITY_CACHE = os.getenv("IDENTITY_CACHE", "1") == "1"
+        self.IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "4096"))
+        self.IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+        # POST /projects/import rows per INSERT batch (and per commit with mode=partial)
+        self.IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+        # GET /sync keeps delete tombstones this long; older cursors get 410 and resync
+        self.SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+
+        # DELETE /projects/<id> of at least this many tasks (0 = only with ?background=1)
+        # soft-deletes and purges in the background, PURGE_CHUNK_SIZE tasks per commit
+        self.PURGE_BACKGROUND_TASKS = int(os.getenv("PURGE_BACKGROUND_TASKS", "5000"))
+        self.PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "500"))
+
+        # manual-order keys longer than this get their task/subtask list respread in the background
+        self.RANK_REBALANCE_LEN = int(os.getenv("RANK_REBALANCE_LEN", "16"))
+
+        # GET /projects/<id>/events: per-subscriber queue, per-project resume history,
+        # open-stream limit (-> 503), heartbeat and max stream age in seconds
+        self.EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+        self.EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+        self.EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "512"))
+        self.EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "200"))
+        self.EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+        self.EVENTS_MAX_AGE = float(os.getenv("EVENTS_MAX_AGE", "300"))
+
+        # Server-Timing header + totals for GET /metrics; SLOW_QUERY_MS > 0 logs slower statements
+        self.METRICS = os.getenv("METRICS", "1") == "1"
+        self.METRICS_ENDPOINT = os.getenv("METRICS_ENDPOINT", "0") == "1"  # serve GET /metrics (no auth)
+        self.SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+        # jsonify() encoder: auto (orjson if installed) | orjson | stdlib
+        self.JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")
+
+        # Accept-Encoding compression (br if the brotli package is installed, else gzip)
+        # for bodies of at least COMPRESS_MIN_BYTES
+        self.COMPRESS = os.getenv("COMPRESS", "1") == "1"
+        self.COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+        self.COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+        self.COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "5"))
+
+        # cookies for local dev + tests
+        self.SESSION_COOKIE_SAMESITE = "Lax"
+        self.SESSION_COOKIE_SECURE = False
+
+        # Flask
+        self.JSON_SORT_KEYS = False
@@ -0,0 +1,51 @@
+# migrations/versions/003_counters.py
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic.
+revision = "0003_counters"
+down_revision = "0002_versions"
+branch_labels = None
+depends_on = None
+
+PROJECT_COUNTERS = [
+    "tasks_todo", "tasks_in_progress", "tasks_done",
+    "tasks_low", "tasks_normal", "tasks_high",
+    "subtasks_total", "subtasks_done",
+]
+TASK_COUNTERS = ["subtasks_total", "subtasks_done"]
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("projects") as batch:
+        for name in PROJECT_COUNTERS:
+            batch.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+    with op.batch_alter_table("tasks") as batch:
+        for name in TASK_COUNTERS:
+            batch.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+
+    # backfill from the existing rows
+    op.execute(
+        "UPDATE tasks SET "
+        "subtasks_total = (SELECT COUNT(*) FROM subtasks s WHERE s.task_id = tasks.id), "
+        "subtasks_done = (SELECT COUNT(*) FROM subtasks s WHERE s.task_id = tasks.id AND s.status = 'done')"
+    )
+    op.execute(
+        "UPDATE projects SET "
+        + ", ".join(
+            f"tasks_{v} = (SELECT COUNT(*) FROM tasks t WHERE t.project_id = projects.id AND t.{col} = '{v}')"
+            for col, values in (("status", ("todo", "in_progress", "done")), ("priority", ("low", "normal", "high")))
+            for v in values
+        )
+        + ", subtasks_total = (SELECT COALESCE(SUM(t.subtasks_total), 0) FROM tasks t WHERE t.project_id = projects.id)"
+        + ", subtasks_done = (SELECT COALESCE(SUM(t.subtasks_done), 0) FROM tasks t WHERE t.project_id = projects.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("tasks") as batch:
+        for name in TASK_COUNTERS:
+            batch.drop_column(name)
+    with op.batch_alter_table("projects") as batch:
+        for name in PROJECT_COUNTERS:
+            batch.drop_column(name)
@@ -0,0 +1,36 @@
+# migrations/versions/004_due_dates.py
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic.
+revision = "0004_due_dates"
+down_revision = "0003_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        # SQLite keeps DATE as 'YYYY-MM-DD' text already, so the column only needs
+        # cleaning (a table rebuild would also drop the search triggers on tasks)
+        op.execute(
+            "UPDATE tasks SET due_date = NULL WHERE due_date IS NOT NULL AND ("
+            "due_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' "
+            "OR date(due_date) IS NULL OR date(due_date) <> due_date)"
+        )
+    else:
+        # databases created by create_all() have VARCHAR(10) here
+        op.execute(
+            "UPDATE tasks SET due_date = NULL "
+            "WHERE due_date IS NOT NULL AND due_date::text !~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'"
+        )
+        op.alter_column(
+            "tasks", "due_date", type_=sa.Date(), existing_nullable=True,
+            postgresql_using="due_date::date",
+        )
+    op.create_index("ix_tasks_project_due", "tasks", ["project_id", "due_date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_project_due", table_name="tasks")
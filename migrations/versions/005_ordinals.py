@@ -0,0 +1,66 @@
+# migrations/versions/005_ordinals.py
+from alembic import op
+import sqlalchemy as sa
+from utils import search
+
+# Revision identifiers, used by Alembic.
+revision = "0005_ordinals"
+down_revision = "0004_due_dates"
+branch_labels = None
+depends_on = None
+
+# position in the tuple = stored code (models.Ordinal)
+COLUMNS = [
+    ("tasks", "status", ("todo", "in_progress", "done")),
+    ("tasks", "priority", ("low", "normal", "high")),
+    ("subtasks", "status", ("todo", "done")),
+]
+DEFAULTS = {"status": "todo", "priority": "normal"}
+INDEXES = [
+    ("ix_tasks_project_status_due", ["project_id", "status", "due_date", "id"]),
+    ("ix_tasks_project_status_priority", ["project_id", "status", "priority", "id"]),
+    ("ix_tasks_project_status_created", ["project_id", "status", "created_at", "id"]),
+]
+
+
+def _recode(table, column, pairs):
+    # rewrite in place as text first so the type change is a plain cast on every backend
+    cases = " ".join(f"WHEN '{old}' THEN '{new}'" for old, new in pairs)
+    op.execute(f"UPDATE {table} SET {column} = CASE {column} {cases} END")
+
+
+def _retype(to_type, from_type, cast, default):
+    # the old default is dropped with the type change (alembic emits DROP DEFAULT
+    # first, Postgres can't cast it) and the new one is set once the type is in place
+    search.drop_triggers(op.get_bind())
+    for table in ("tasks", "subtasks"):
+        with op.batch_alter_table(table) as batch:
+            for t, column, values in COLUMNS:
+                if t == table:
+                    batch.alter_column(
+                        column, type_=to_type, existing_type=from_type, server_default=None,
+                        existing_nullable=False, postgresql_using=f"{column}::{cast}",
+                    )
+        with op.batch_alter_table(table) as batch:
+            for t, column, values in COLUMNS:
+                if t == table:
+                    batch.alter_column(column, server_default=default(column, values), existing_type=to_type)
+    search.restore_triggers(op.get_bind())
+
+
+def upgrade() -> None:
+    for table, column, values in COLUMNS:
+        _recode(table, column, [(v, i) for i, v in enumerate(values)])
+    _retype(sa.SmallInteger(), sa.String(20), "smallint",
+            lambda column, values: str(values.index(DEFAULTS[column])))
+    for name, cols in INDEXES:
+        op.create_index(name, "tasks", cols)
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="tasks")
+    _retype(sa.String(20), sa.SmallInteger(), "varchar",
+            lambda column, values: DEFAULTS[column])
+    for table, column, values in COLUMNS:
+        _recode(table, column, [(i, v) for i, v in enumerate(values)])
@@ -0,0 +1,48 @@
+# migrations/versions/006_owner_columns.py
+from alembic import op
+import sqlalchemy as sa
+from utils import search
+
+# Revision identifiers, used by Alembic.
+revision = "0006_owner_columns"
+down_revision = "0005_ordinals"
+branch_labels = None
+depends_on = None
+
+OPEN = sa.text("status != 2")  # status is an ordinal since 0005: 2 = done
+
+
+def upgrade() -> None:
+    for table in ("tasks", "subtasks"):
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("owner_id", sa.Integer(), nullable=True))
+
+    op.execute("UPDATE tasks SET owner_id = (SELECT owner_id FROM projects p WHERE p.id = tasks.project_id)")
+    op.execute("UPDATE subtasks SET owner_id = (SELECT owner_id FROM tasks t WHERE t.id = subtasks.task_id)")
+
+    # NOT NULL + FK rebuild the tables on SQLite (see 0005 for the triggers)
+    search.drop_triggers(op.get_bind())
+    for table in ("tasks", "subtasks"):
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("owner_id", existing_type=sa.Integer(), nullable=False)
+            batch.create_foreign_key(f"fk_{table}_owner_id_users", "users", ["owner_id"], ["id"])
+    search.restore_triggers(op.get_bind())
+
+    op.create_index("ix_tasks_owner_due", "tasks", ["owner_id", "due_date", "id"])
+    op.create_index(
+        "ix_tasks_owner_agenda", "tasks", ["owner_id", "due_date", sa.text("priority DESC"), "id"],
+        sqlite_where=OPEN, postgresql_where=OPEN,
+    )
+    op.create_index("ix_subtasks_owner_status", "subtasks", ["owner_id", "status", "task_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_subtasks_owner_status", table_name="subtasks")
+    op.drop_index("ix_tasks_owner_agenda", table_name="tasks")
+    op.drop_index("ix_tasks_owner_due", table_name="tasks")
+    search.drop_triggers(op.get_bind())
+    for table in ("subtasks", "tasks"):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_constraint(f"fk_{table}_owner_id_users", type_="foreignkey")
+            batch.drop_column("owner_id")
+    search.restore_triggers(op.get_bind())
@@ -0,0 +1,72 @@
+# migrations/versions/007_sync.py
+from alembic import op
+import sqlalchemy as sa
+from utils import search
+
+# Revision identifiers, used by Alembic.
+revision = "0007_sync"
+down_revision = "0006_owner_columns"
+branch_labels = None
+depends_on = None
+
+TABLES = ("projects", "tasks", "subtasks")
+OPEN = sa.text("status != 2")
+
+
+def _agenda_index(create: bool):
+    # SQLite's table rebuild re-creates indexes from reflection, which loses the
+    # DESC on priority, so this one is dropped around it and created again
+    if create:
+        op.create_index(
+            "ix_tasks_owner_agenda", "tasks", ["owner_id", "due_date", sa.text("priority DESC"), "id"],
+            sqlite_where=OPEN, postgresql_where=OPEN,
+        )
+    else:
+        op.drop_index("ix_tasks_owner_agenda", table_name="tasks")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+    # NOT NULL rebuilds the tables on SQLite (see 0005 for the triggers)
+    _agenda_index(create=False)
+    search.drop_triggers(op.get_bind())
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+    search.restore_triggers(op.get_bind())
+    _agenda_index(create=True)
+
+    for table in TABLES:
+        op.create_index(f"ix_{table}_owner_updated", table, ["owner_id", "updated_at", "id"])
+
+    # create_app()'s create_all() runs before every `flask db` command and has
+    # already made the table (with its index) when the app is newer than this
+    # revision; creating it again would stop the upgrade half-applied on SQLite
+    if sa.inspect(op.get_bind()).has_table("tombstones"):
+        return
+    op.create_table(
+        "tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=10), nullable=False),
+        sa.Column("ref_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_tombstones_owner_deleted", "tombstones", ["owner_id", "deleted_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tombstones_owner_deleted", table_name="tombstones")
+    op.drop_table("tombstones")
+    _agenda_index(create=False)
+    search.drop_triggers(op.get_bind())
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_owner_updated", table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("updated_at")
+    search.restore_triggers(op.get_bind())
+    _agenda_index(create=True)
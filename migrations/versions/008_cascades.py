@@ -0,0 +1,63 @@
+# migrations/versions/008_cascades.py
+from alembic import op
+import sqlalchemy as sa
+from utils import search
+
+# Revision identifiers, used by Alembic.
+revision = "0008_cascades"
+down_revision = "0007_sync"
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table): the parent links that cascade on delete
+PARENTS = (("tasks", "project_id", "projects"), ("subtasks", "task_id", "tasks"))
+# names the unnamed FKs that SQLite reflects, so the batch rebuild can drop them
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+OPEN = sa.text("status != 2")
+PURGING = sa.text("deleted_at IS NOT NULL")
+
+
+def _old_name(table, column, referred):
+    if op.get_bind().dialect.name == "sqlite":
+        return f"fk_{table}_{column}_{referred}"
+    return f"{table}_{column}_fkey"  # Postgres' default for the 0001 / create_all() constraint
+
+
+def _agenda_index(create: bool):
+    # lost its DESC in SQLite's rebuild otherwise (see 0007)
+    if create:
+        op.create_index(
+            "ix_tasks_owner_agenda", "tasks", ["owner_id", "due_date", sa.text("priority DESC"), "id"],
+            sqlite_where=OPEN, postgresql_where=OPEN,
+        )
+    else:
+        op.drop_index("ix_tasks_owner_agenda", table_name="tasks")
+
+
+def _relink(ondelete, drop_name):
+    _agenda_index(create=False)
+    search.drop_triggers(op.get_bind())
+    for table, column, referred in PARENTS:
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch:
+            batch.drop_constraint(drop_name(table, column, referred), type_="foreignkey")
+            batch.create_foreign_key(f"fk_{table}_{column}_{referred}", referred, [column], ["id"],
+                                     ondelete=ondelete)
+    search.restore_triggers(op.get_bind())
+    _agenda_index(create=True)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("projects") as batch:
+        batch.add_column(sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_projects_purging", "projects", ["owner_id"],
+                    sqlite_where=PURGING, postgresql_where=PURGING)
+    _relink("CASCADE", _old_name)
+
+
+def downgrade() -> None:
+    _relink(None, lambda table, column, referred: f"fk_{table}_{column}_{referred}")
+    op.drop_index("ix_projects_purging", table_name="projects")
+    search.drop_triggers(op.get_bind())
+    with op.batch_alter_table("projects") as batch:
+        batch.drop_column("deleted_at")
+    search.restore_triggers(op.get_bind())
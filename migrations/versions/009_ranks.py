@@ -0,0 +1,86 @@
+# migrations/versions/009_ranks.py
+import itertools
+from alembic import op
+import sqlalchemy as sa
+from utils import search
+
+# Revision identifiers, used by Alembic.
+revision = "0009_ranks"
+down_revision = "0008_cascades"
+branch_labels = None
+depends_on = None
+
+# table, column its order is scoped to; existing rows keep their id order
+RANKED = (("tasks", "project_id"), ("subtasks", "task_id"))
+OPEN = sa.text("status != 2")
+
+# the key layout of utils/ranks.py spread() when this was written
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+WIDTH, SPACE, STEP = 6, 36 ** 6, 36 ** 2
+
+
+def _encode(n: int) -> str:
+    digits = []
+    for _ in range(WIDTH):
+        n, d = divmod(n, 36)
+        digits.append(DIGITS[d])
+    return "".join(reversed(digits)).rstrip("0")
+
+
+def _spread(count: int) -> list:
+    step = min(STEP, SPACE // (count + 1))
+    start = (SPACE - step * (count - 1)) // 2
+    return [_encode(start + step * i) for i in range(count)]
+
+
+def _backfill(table, parent):
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(f"SELECT id, {parent} FROM {table} ORDER BY {parent}, id")).all()
+    ranks = []
+    for _, group in itertools.groupby(rows, key=lambda r: r[1]):
+        ids = [r[0] for r in group]
+        ranks += [{"id": i, "rank": k} for i, k in zip(ids, _spread(len(ids)))]
+    if ranks:
+        conn.execute(sa.text(f"UPDATE {table} SET rank = :rank WHERE id = :id"), ranks)
+
+
+def _agenda_index(create: bool):
+    # lost its DESC in SQLite's rebuild otherwise (see 0007)
+    if create:
+        op.create_index(
+            "ix_tasks_owner_agenda", "tasks", ["owner_id", "due_date", sa.text("priority DESC"), "id"],
+            sqlite_where=OPEN, postgresql_where=OPEN,
+        )
+    else:
+        op.drop_index("ix_tasks_owner_agenda", table_name="tasks")
+
+
+def upgrade() -> None:
+    for table, parent in RANKED:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("rank", sa.String(length=64), nullable=True))
+        _backfill(table, parent)
+
+    # NOT NULL rebuilds the tables on SQLite (see 0005 for the triggers)
+    _agenda_index(create=False)
+    search.drop_triggers(op.get_bind())
+    for table, _ in RANKED:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("rank", existing_type=sa.String(length=64), nullable=False)
+    search.restore_triggers(op.get_bind())
+    _agenda_index(create=True)
+
+    op.create_index("ix_tasks_project_rank", "tasks", ["project_id", "rank", "id"])
+    op.create_index("ix_subtasks_task_rank", "subtasks", ["task_id", "rank", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_subtasks_task_rank", table_name="subtasks")
+    op.drop_index("ix_tasks_project_rank", table_name="tasks")
+    _agenda_index(create=False)
+    search.drop_triggers(op.get_bind())
+    for table, _ in RANKED:
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("rank")
+    search.restore_triggers(op.get_bind())
+    _agenda_index(create=True)
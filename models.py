@@ -1,12 +1,48 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin
-from flask_bcrypt import Bcrypt
 from datetime import datetime
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import object_session
+from sqlalchemy.types import TypeDecorator, SmallInteger
+from utils.hashing import hasher
+from utils.identity import identities, Identity
+from utils.metrics import timed
+from utils.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
-bcrypt = Bcrypt()
+
+TASK_STATUSES = ("todo", "in_progress", "done")
+TASK_PRIORITIES = ("low", "normal", "high")
+SUBTASK_STATUSES = ("todo", "done")
+
+class Ordinal(TypeDecorator):
+    # enum-like column stored as its position in `values`: rows and index entries
+    # hold a small int, ORDER BY follows the tuple order (low < normal < high), and
+    # Python code (to_dict, filters, bulk rows) keeps using the strings
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values):
+        super().__init__()
+        self.values = tuple(values)
+        self.codes = {v: i for i, v in enumerate(self.values)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return self.codes[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not one of {self.values}") from None
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.values[int(value)]
+
+    @property
+    def python_type(self):
+        return str
 
 class User(db.Model, UserMixin):
     __tablename__ = "users"
@@ -15,21 +51,50 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    projects_version = db.Column(db.Integer, default=1, server_default="1", nullable=False)  # bumped when the project list changes
 
     projects = db.relationship("Project", backref="owner", lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, raw: str):
-        self.password_hash = bcrypt.generate_password_hash(raw).decode("utf-8")
+        self.password_hash = hasher.hash(raw)
 
     def check_password(self, raw: str) -> bool:
-        return bcrypt.check_password_hash(self.password_hash, raw)
+        return hasher.check(self.password_hash, raw)
+
+    def password_needs_rehash(self) -> bool:
+        # stored with a different bcrypt cost than BCRYPT_LOG_ROUNDS
+        return hasher.needs_rehash(self.password_hash)
 
     def to_dict(self):
         return {"id": self.id, "username": self.username, "email": self.email}
 
 @login_manager.user_loader
+@timed("auth")
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    if not identities.enabled:
+        return User.query.get(int(user_id))
+    ident = identities.get(int(user_id))
+    if ident is None:
+        # cached for a while: never fill it from a lagging replica
+        u = db.session.get(User, int(user_id), bind_arguments={"primary": True})
+        if u is None:
+            return None
+        ident = identities.put(Identity.from_user(u))
+    return ident
+
+# drop cached identities once a change to the user row has committed
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_row_changed(mapper, connection, target):
+    object_session(target).info.setdefault("evict_users", set()).add(target.id)
+
+@event.listens_for(db.session, "after_commit")
+def _evict_identities(session):
+    identities.evict(*session.info.pop("evict_users", ()))
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _keep_identities(session, previous_transaction):
+    session.info.pop("evict_users", None)
 
 class Project(db.Model):
     __tablename__ = "projects"
@@ -38,24 +103,94 @@ class Project(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.String(500), default="", nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)  # GET /sync
+    version = db.Column(db.Integer, default=1, server_default="1", nullable=False)  # bumped by every task/subtask write
+    deleted_at = db.Column(db.DateTime, nullable=True)  # soft-deleted, rows still being purged (utils/purge.py)
 
-    tasks = db.relationship("Task", backref="project", lazy=True, cascade="all, delete-orphan")
+    # counters maintained by the write handlers (utils/counters.py); `flask reconcile-counters` repairs drift
+    tasks_todo = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    tasks_in_progress = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    tasks_done = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    tasks_low = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    tasks_normal = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    tasks_high = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    subtasks_total = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    subtasks_done = db.Column(db.Integer, default=0, server_default="0", nullable=False)
 
+    # children go with ON DELETE CASCADE in the database; passive_deletes keeps the
+    # ORM from loading them just to delete them one by one
+    tasks = db.relationship("Task", backref="project", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        db.Index("ix_projects_owner_updated", "owner_id", "updated_at", "id"),
+        db.Index("ix_projects_purging", "owner_id",
+                 sqlite_where=deleted_at.isnot(None), postgresql_where=deleted_at.isnot(None)),
+    )
+
+    @timed("serialize")
     def to_dict(self):
         return {"id": self.id, "title": self.title, "description": self.description}
 
+    # List endpoints select only LIST_COLUMNS (plain rows, no ORM objects) and
+    # build the same dict as to_dict() from the row; keep the two in step.
+    LIST_COLUMNS = (id, title, description)
+
+    @staticmethod
+    def row_dict(row):
+        id, title, description = row
+        return {"id": id, "title": title, "description": description}
+
+    # what stats_dict() reads; ?fields= projections load just these plus the fields
+    STATS_COLUMNS = (tasks_todo, tasks_in_progress, tasks_done, tasks_low, tasks_normal, tasks_high,
+                     subtasks_total, subtasks_done)
+
+    def stats_dict(self):
+        by_status = {"todo": self.tasks_todo, "in_progress": self.tasks_in_progress, "done": self.tasks_done}
+        by_priority = {"low": self.tasks_low, "normal": self.tasks_normal, "high": self.tasks_high}
+        return {
+            "tasks": {"total": sum(by_status.values()), "by_status": by_status, "by_priority": by_priority},
+            "subtasks": {"total": self.subtasks_total, "done": self.subtasks_done},
+        }
+
+def purging_projects(owner_id):
+    # the owner's soft-deleted projects whose rows are still being purged; views that
+    # read tasks/subtasks by owner_id (no join to projects) leave these out
+    return select(Project.id).where(Project.owner_id == owner_id, Project.deleted_at.isnot(None))
+
 class Task(db.Model):
     __tablename__ = "tasks"
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)  # = project.owner_id, see _sync_owner
     title = db.Column(db.String(300), nullable=False)
-    status = db.Column(db.String(20), default="todo", nullable=False)       # todo | in_progress | done
-    priority = db.Column(db.String(20), default="normal", nullable=False)   # low | normal | high
-    due_date = db.Column(db.String(10), nullable=True)  # store as 'YYYY-MM-DD' for simplicity
+    status = db.Column(Ordinal(TASK_STATUSES), default="todo", server_default="0", nullable=False)        # todo | in_progress | done
+    priority = db.Column(Ordinal(TASK_PRIORITIES), default="normal", server_default="1", nullable=False)  # low | normal | high
+    due_date = db.Column(db.Date, nullable=True)  # 'YYYY-MM-DD' over the API (utils/dates.py)
+    rank = db.Column(db.String(64), nullable=False)  # manual order within the project (utils/ranks.py)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    subtasks_total = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    subtasks_done = db.Column(db.Integer, default=0, server_default="0", nullable=False)
 
-    subtasks = db.relationship("Subtask", backref="task", lazy=True, cascade="all, delete-orphan")
+    subtasks = db.relationship("Subtask", backref="task", lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
+    # The (project_id, status, <sort>, id) indexes serve list_tasks filtered by status
+    # in sort order, so pages come straight off the index with no sort step. The
+    # owner_id ones answer the cross-project views (GET /tasks/due, GET /agenda)
+    # from one range; the agenda index only holds open tasks.
+    __table_args__ = (
+        db.Index("ix_tasks_project_due", "project_id", "due_date"),
+        db.Index("ix_tasks_owner_due", "owner_id", "due_date", "id"),
+        db.Index("ix_tasks_owner_updated", "owner_id", "updated_at", "id"),
+        db.Index("ix_tasks_owner_agenda", "owner_id", "due_date", priority.desc(), "id",
+                 sqlite_where=status != "done", postgresql_where=status != "done"),
+        db.Index("ix_tasks_project_status_due", "project_id", "status", "due_date", "id"),
+        db.Index("ix_tasks_project_status_priority", "project_id", "status", "priority", "id"),
+        db.Index("ix_tasks_project_status_created", "project_id", "status", "created_at", "id"),
+        db.Index("ix_tasks_project_rank", "project_id", "rank", "id"),
+    )
+
+    @timed("serialize")
     def to_dict(self):
         return {
             "id": self.id,
@@ -63,22 +198,111 @@ class Task(db.Model):
             "title": self.title,
             "status": self.status,
             "priority": self.priority,
-            "due_date": self.due_date,
+            "due_date": self.due_date.isoformat() if self.due_date else None,
             "created_at": self.created_at.strftime("%Y-%m-%d"),
+            "rank": self.rank,
+        }
+
+    LIST_COLUMNS = (id, project_id, title, status, priority, due_date, created_at, rank)
+
+    @staticmethod
+    def row_dict(row):
+        id, project_id, title, status, priority, due_date, created_at, rank = row
+        return {
+            "id": id,
+            "project_id": project_id,
+            "title": title,
+            "status": status,
+            "priority": priority,
+            "due_date": due_date.isoformat() if due_date else None,
+            "created_at": created_at.strftime("%Y-%m-%d"),
+            "rank": rank,
         }
 
+    # how ?fields= projections (utils/fields.py) format these, as row_dict() does
+    FIELD_FORMATS = {
+        "due_date": lambda v: v.isoformat() if v else None,
+        "created_at": lambda v: v.strftime("%Y-%m-%d"),
+    }
+
 class Subtask(db.Model):
     __tablename__ = "subtasks"
     id = db.Column(db.Integer, primary_key=True)
-    task_id = db.Column(db.Integer, db.ForeignKey("tasks.id"), nullable=False, index=True)
+    task_id = db.Column(db.Integer, db.ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)  # = task.owner_id
     title = db.Column(db.String(300), nullable=False)
-    status = db.Column(db.String(20), default="todo", nullable=False)  # todo | done
+    status = db.Column(Ordinal(SUBTASK_STATUSES), default="todo", server_default="0", nullable=False)  # todo | done
+    rank = db.Column(db.String(64), nullable=False)  # manual order within the task (utils/ranks.py)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_subtasks_owner_status", "owner_id", "status", "task_id"),
+        db.Index("ix_subtasks_owner_updated", "owner_id", "updated_at", "id"),
+        db.Index("ix_subtasks_task_rank", "task_id", "rank", "id"),
+    )
 
+    @timed("serialize")
     def to_dict(self):
         return {
             "id": self.id,
             "task_id": self.task_id,
             "title": self.title,
             "status": self.status,
-        }
\ No newline at end of file
+            "rank": self.rank,
+        }
+
+    LIST_COLUMNS = (id, task_id, title, status, rank)
+
+    @staticmethod
+    def row_dict(row):
+        id, task_id, title, status, rank = row
+        return {"id": id, "task_id": task_id, "title": title, "status": status, "rank": rank}
+
+class Tombstone(db.Model):
+    # a deleted project/task/subtask, kept for GET /sync clients; children of a
+    # deleted project or task are implied and get no row of their own
+    __tablename__ = "tombstones"
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # project | task | subtask
+    ref_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index("ix_tombstones_owner_deleted", "owner_id", "deleted_at", "id"),)
+
+    def to_dict(self):
+        return {"kind": self.kind, "id": self.ref_id}
+
+# owner_id on tasks/subtasks copies the project's owner so per-user queries need
+# no join. Handlers set it on insert (they have just authorized the project); an
+# ORM insert that leaves it out picks it up here, and reassigning a project
+# (ORM flush of Project.owner_id) carries its tasks and subtasks along (the
+# previous owner's sync clients get a tombstone).
+@event.listens_for(Task, "before_insert")
+def _task_owner(mapper, connection, target):
+    if target.owner_id is None:
+        target.owner_id = connection.scalar(
+            select(Project.owner_id).where(Project.id == target.project_id)
+        )
+
+@event.listens_for(Subtask, "before_insert")
+def _subtask_owner(mapper, connection, target):
+    if target.owner_id is None:
+        target.owner_id = connection.scalar(select(Task.owner_id).where(Task.id == target.task_id))
+
+@event.listens_for(Project, "after_update")
+def _sync_owner(mapper, connection, target):
+    changed = inspect(target).attrs.owner_id.history.deleted
+    if not changed:
+        return
+    tasks, subtasks = Task.__table__, Subtask.__table__
+    connection.execute(
+        update(tasks).where(tasks.c.project_id == target.id).values(owner_id=target.owner_id)
+    )
+    connection.execute(
+        update(subtasks)
+        .where(subtasks.c.task_id.in_(select(tasks.c.id).where(tasks.c.project_id == target.id)))
+        .values(owner_id=target.owner_id)
+    )
+    connection.execute(insert(Tombstone.__table__).values(owner_id=changed[0], kind="project", ref_id=target.id))
@@ -1,19 +1,71 @@
 # routes/projects.py
-from flask import Blueprint, request, jsonify, abort
+import csv
+from flask import Blueprint, Response, abort, current_app, request, jsonify, stream_with_context
+from datetime import date
 from flask_login import login_required, current_user
-from models import db, Project
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from models import db, Project, Task, User
+from routes.tasks import task_page
+from utils.authz import require_project
+from utils.cache import cache, request_key
+from utils.changes import project_list_changed, project_deleted, project_list_tag, task_list_tag, project_subtasks_tag
+from utils.conditional import etag_for, not_modified, tagged
+from utils.events import events
+from utils.fields import requested, InvalidFields
+from utils.metrics import phase
+from utils.purge import purger
+from utils.export import project_records, ndjson_lines, csv_lines, chunked
+from utils.importer import Importer, ImportFailed, MAX_BATCH_SIZE, open_body, ndjson_records, csv_records
 
 bp = Blueprint("projects", __name__)
 
-def require_owner(project: Project):
-    if not project or project.owner_id != current_user.id:
-        abort(404)
-
 @bp.get("")
 @login_required
 def list_projects():
-    items = Project.query.filter_by(owner_id=current_user.id).order_by(Project.id.asc()).all()
-    return jsonify([p.to_dict() for p in items]), 200
+    with_stats = request.args.get("with_stats") in ("1", "true")
+    try:
+        fields = requested(Project, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
+    # from the row, not current_user: the cached identity can be older than a
+    # project added through another process
+    version = db.session.scalar(select(User.projects_version).where(User.id == current_user.id))
+    if with_stats:
+        # counters move with every task write, so fold the project versions in too
+        # (versions only grow, so count + sum changes whenever any of them does)
+        count, total = (
+            db.session.query(func.count(Project.id), func.coalesce(func.sum(Project.version), 0))
+            .filter(Project.owner_id == current_user.id, Project.deleted_at.is_(None)).one()
+        )
+        version = f"{version}.{count}.{total}"
+    etag = etag_for(f"u{current_user.id}", version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    key = request_key("projects", f"v{version}")  # a version bumped elsewhere misses this process's copy
+    payload = cache.get(key)
+    if payload is None:
+        tags = [project_list_tag(current_user.id)]
+        if with_stats:
+            q = Project.query.filter_by(owner_id=current_user.id, deleted_at=None).order_by(Project.id.asc())
+            serialize = Project.to_dict
+            if fields:
+                q = q.options(fields.load_only(Project.id, *Project.STATS_COLUMNS))
+                serialize = fields.row_dict
+            items = q.all()
+            payload = [{**serialize(p), "stats": p.stats_dict()} for p in items]
+            tags += [t for p in items for t in (task_list_tag(p.id), project_subtasks_tag(p.id))]
+        else:
+            columns, serialize = (fields.columns, fields.row_dict) if fields else (Project.LIST_COLUMNS, Project.row_dict)
+            rows = db.session.execute(
+                select(*columns).where(Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+                .order_by(Project.id.asc())
+            )
+            with phase("serialize"):
+                payload = [serialize(r) for r in rows]
+        cache.set(key, payload, tags=tags)
+    return tagged(jsonify(payload), etag), 200
 
 @bp.post("")
 @login_required
@@ -25,21 +77,144 @@ def create_project():
         return jsonify(error="title is required"), 400
     p = Project(owner_id=current_user.id, title=title, description=description)
     db.session.add(p)
+    project_list_changed(current_user.id)
     db.session.commit()
     return jsonify(p.to_dict()), 201
 
 @bp.get("/<int:project_id>")
 @login_required
 def get_project(project_id: int):
-    p = Project.query.get(project_id)
-    require_owner(p)
-    return jsonify(p.to_dict()), 200
+    try:
+        fields = requested(Project, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
+    if fields is None:
+        return jsonify(require_project(project_id).to_dict()), 200
+    row = db.session.execute(
+        select(*fields.columns)
+        .where(Project.id == project_id, Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+    ).first()
+    if row is None:
+        abort(404)
+    return jsonify(fields.row_dict(row)), 200
+
+@bp.get("/<int:project_id>/stats")
+@login_required
+def project_stats(project_id: int):
+    p = require_project(project_id)
+    stats = p.stats_dict()
+    # overdue depends on today's date, so it is counted rather than maintained
+    stats["tasks"]["overdue"] = (
+        Task.query.filter(Task.project_id == p.id, Task.status != "done",
+                          Task.due_date < date.today())
+        .count()
+    )
+    return jsonify(id=p.id, stats=stats), 200
+
+@bp.get("/<int:project_id>/tree")
+@login_required
+def project_tree(project_id: int):
+    # project + one page of tasks (same args as GET /tasks) + their subtasks, in a
+    # fixed number of queries: subtasks for the whole page come from one IN (...) select
+    p = require_project(project_id)
+    etag = etag_for(f"p{p.id}", p.version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    def with_subtasks(t: Task):
+        d = t.to_dict()
+        d["subtasks"] = [s.to_dict() for s in sorted(t.subtasks, key=lambda s: (s.rank, s.id))]
+        return d
+
+    key = request_key("tree", p.id, f"v{p.version}")  # as list_tasks
+    payload = cache.get(key)
+    if payload is None:
+        page, error = task_page(project_id, request.args, serializer=with_subtasks,
+                                options=(selectinload(Task.subtasks),))
+        if error:
+            return jsonify(error=error), 400
+        payload = {"project": p.to_dict(), "tasks": page["data"], "meta": page["meta"]}
+        cache.set(key, payload, tags=[task_list_tag(p.id), project_subtasks_tag(p.id)])
+    return tagged(jsonify(payload), etag), 200
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv; charset=utf-8"),
+}
+
+@bp.get("/<int:project_id>/export")
+@login_required
+def export_project(project_id: int):
+    p = require_project(project_id)
+    fmt = (request.args.get("format") or "ndjson").strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error="format must be ndjson or csv"), 400
+    encode, mimetype = EXPORT_FORMATS[fmt]
+    gzip = request.args.get("gzip") in ("1", "true") or "gzip" in request.accept_encodings
+
+    body = chunked(encode(project_records(db.session, p)), gzip=gzip)
+    resp = Response(stream_with_context(body), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="project-{p.id}.{fmt}"'
+    resp.headers["Vary"] = "Accept-Encoding"
+    if gzip:
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+@bp.get("/<int:project_id>/events")
+@login_required
+def project_events(project_id: int):
+    # SSE stream of task/subtask changes; EventSource resends the last id it saw
+    p = require_project(project_id)
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return events.response(p.id, last_id)
+
+@bp.post("/import")
+@login_required
+def import_project():
+    # body: the export format (NDJSON by default, CSV with ?format=csv or a text/csv body)
+    fmt = (request.args.get("format") or "").strip().lower()
+    if not fmt:
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error="format must be ndjson or csv"), 400
+    mode = (request.args.get("mode") or "atomic").strip().lower()
+    if mode not in ("atomic", "partial"):
+        return jsonify(error="mode must be atomic or partial"), 400
+    try:
+        batch_size = int(request.args.get("batch_size") or current_app.config["IMPORT_BATCH_SIZE"])
+    except ValueError:
+        return jsonify(error="batch_size must be an integer"), 400
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    into = request.args.get("into", type=int)
+    if into is not None:
+        into = require_project(into).id
+
+    lines = open_body(request.stream, request.headers.get("Content-Encoding"))
+    records = csv_records(lines) if fmt == "csv" else ndjson_records(lines)
+    importer = Importer(current_user.id, into=into, batch_size=batch_size, atomic=mode == "atomic")
+    try:
+        report = importer.run(records)
+    except ImportFailed as e:
+        db.session.rollback()
+        return jsonify(error=e.error, line=e.line), 400
+    except (OSError, EOFError, UnicodeDecodeError, csv.Error):
+        # truncated/corrupt gzip, bad encoding or broken CSV quoting; anything
+        # already committed by mode=partial stays
+        db.session.rollback()
+        return jsonify(error="could not read request body"), 400
+    return jsonify(report), 201
 
 @bp.delete("/<int:project_id>")
 @login_required
 def delete_project(project_id: int):
-    p = Project.query.get(project_id)
-    require_owner(p)
+    # tasks/subtasks go by ON DELETE CASCADE; big projects are purged in the background
+    p = require_project(project_id)
+    project_deleted(current_user.id, p.id)
+    if request.args.get("background") in ("1", "true") or purger.too_big(p):
+        purger.soft_delete(p)
+        db.session.commit()  # the purge may already be gone with the row: no reloading p after this
+        return jsonify(id=project_id, status="purging"), 202
     db.session.delete(p)
     db.session.commit()
     return ("", 204)
\ No newline at end of file
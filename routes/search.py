@@ -0,0 +1,18 @@
+# routes/search.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from models import db
+from utils.search import search
+
+bp = Blueprint("search", __name__)
+
+@bp.get("")
+@login_required
+def search_all():
+    q = (request.args.get("q") or "").strip()
+    page = max(1, request.args.get("page", default=1, type=int))
+    per_page = min(50, max(1, request.args.get("per_page", default=10, type=int)))
+    result = search(db.session, current_user.id, q, page=page, per_page=per_page)
+    if result is None:
+        return jsonify(error="q is required"), 400
+    return jsonify(result), 200
@@ -1,23 +1,21 @@
 # routes/subtasks.py
 from flask import Blueprint, request, jsonify, abort
 from flask_login import login_required, current_user
-from models import db, Subtask, Task, Project
+from sqlalchemy import select, update, delete
+from models import db, Task, Subtask, SUBTASK_STATUSES, purging_projects
+from utils.authz import require_task, require_subtask, owned_task_projects, owned_subtasks
+from utils.cache import cache, request_key
+from utils.changes import subtasks_changed, subtask_list_tag, deleted, emit, emit_by_project
+from utils.counters import Tally
+from utils.conditional import etag_for, not_modified, tagged
+from utils.bulk import bulk_items, insert_returning, as_id, text, item_ok, item_error
+from utils.fields import requested, InvalidFields
+from utils.metrics import phase
+from utils.ranks import Appender, place, placement
 
 bp = Blueprint("subtasks", __name__)
 
-def user_owns_task(task_id: int) -> bool:
-    if not task_id:
-        return False
-    t = Task.query.get(task_id)
-    if not t:
-        return False
-    p = Project.query.get(t.project_id)
-    return bool(p and p.owner_id == current_user.id)
-
-def user_owns_subtask(subtask: Subtask) -> bool:
-    if not subtask:
-        return False
-    return user_owns_task(subtask.task_id)
+VALID_STATUS = set(SUBTASK_STATUSES)
 
 @bp.get("")
 @login_required
@@ -25,10 +23,46 @@ def list_subtasks():
     task_id = request.args.get("task_id", type=int)
     if not task_id:
         return jsonify(error="task_id is required"), 400
-    if not user_owns_task(task_id):
+    t = require_task(task_id)
+    try:
+        fields = requested(Subtask, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
+    etag = etag_for(f"p{t.project_id}", t.project.version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    key = request_key("subtasks", t.id, f"v{t.project.version}")  # as list_tasks
+    payload = cache.get(key)
+    if payload is None:
+        columns, serialize = (fields.columns, fields.row_dict) if fields else (Subtask.LIST_COLUMNS, Subtask.row_dict)
+        rows = db.session.execute(
+            select(*columns).where(Subtask.task_id == task_id).order_by(Subtask.rank.asc(), Subtask.id.asc())
+        )
+        with phase("serialize"):
+            payload = [serialize(r) for r in rows]
+        cache.set(key, payload, tags=[subtask_list_tag(t.id)])
+    return tagged(jsonify(payload), etag), 200
+
+@bp.get("/<int:subtask_id>")
+@login_required
+def get_subtask(subtask_id: int):
+    try:
+        fields = requested(Subtask, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
+    if fields is None:
+        return jsonify(require_subtask(subtask_id).to_dict()), 200
+    # owner_id mirrors the project's owner, so this one select also authorizes
+    row = db.session.execute(
+        select(*fields.columns).where(
+            Subtask.id == subtask_id, Subtask.owner_id == current_user.id,
+            Subtask.task_id.not_in(select(Task.id).where(Task.project_id.in_(purging_projects(current_user.id)))),
+        )
+    ).first()
+    if row is None:
         abort(404)
-    items = Subtask.query.filter_by(task_id=task_id).order_by(Subtask.id.asc()).all()
-    return jsonify([s.to_dict() for s in items]), 200
+    return jsonify(fields.row_dict(row)), 200
 
 @bp.post("")
 @login_required
@@ -38,36 +72,190 @@ def create_subtask():
     title = (data.get("title") or "").strip()
     if not task_id or not title:
         return jsonify(error="task_id and title are required"), 400
-    if not user_owns_task(task_id):
-        abort(404)
-    s = Subtask(task_id=task_id, title=title, status="todo")
+    t = require_task(task_id)
+    s = Subtask(task_id=task_id, owner_id=current_user.id, title=title, status="todo",
+                rank=Appender(Subtask).next(t.id))
     db.session.add(s)
+    Tally().subtask(t.id, t.project_id, s.status).apply()
+    subtasks_changed((t.id, t.project_id))
+    emit(t.project_id, "subtask.created", [s.to_dict()])
     db.session.commit()
     return jsonify(s.to_dict()), 201
 
 @bp.patch("/<int:subtask_id>")
 @login_required
 def update_subtask(subtask_id: int):
-    s = Subtask.query.get(subtask_id)
-    if not user_owns_subtask(s):
-        abort(404)
+    s = require_subtask(subtask_id)
+    before = s.status
 
     data = request.get_json(silent=True) or {}
     if "title" in data:
         s.title = (data.get("title") or "").strip() or s.title
     if "status" in data:
         val = (data.get("status") or "").strip()
-        if val in {"todo", "done"}:
+        if val in VALID_STATUS:
             s.status = val
+    project_id = s.task.project_id
+    Tally().subtask(s.task_id, project_id, before, -1).subtask(s.task_id, project_id, s.status).apply()
+    subtasks_changed((s.task_id, project_id))
+    emit(project_id, "subtask.updated", [s.to_dict()])
+    db.session.commit()
+    return jsonify(s.to_dict()), 200
+
+@bp.post("/<int:subtask_id>/move")
+@login_required
+def move_subtask(subtask_id: int):
+    # same body as POST /tasks/<id>/move, within the subtask's task
+    s = require_subtask(subtask_id)
+    try:
+        anchor_id, after_anchor = placement(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if anchor_id == s.id:
+        return jsonify(error="cannot move a subtask relative to itself"), 400
+    project_id = s.task.project_id
+    subtasks_changed((s.task_id, project_id))  # the project row first, as in move_task
+    try:
+        s.rank, respread = place(Subtask, s.task_id, s.id, anchor_id, after_anchor)
+    except LookupError:
+        return jsonify(error="subtask to move next to not found in this task"), 404
+    if respread:
+        emit(project_id, "subtasks.reordered", [{"task_id": s.task_id}])
+    else:
+        emit(project_id, "subtask.updated", [s.to_dict()])
     db.session.commit()
     return jsonify(s.to_dict()), 200
 
 @bp.delete("/<int:subtask_id>")
 @login_required
 def delete_subtask(subtask_id: int):
-    s = Subtask.query.get(subtask_id)
-    if not user_owns_subtask(s):
-        abort(404)
+    s = require_subtask(subtask_id)
     db.session.delete(s)
+    Tally().subtask(s.task_id, s.task.project_id, s.status, -1).apply()
+    subtasks_changed((s.task_id, s.task.project_id))
+    deleted("subtask", current_user.id, s.id)
+    emit(s.task.project_id, "subtask.deleted", [{"id": s.id, "task_id": s.task_id}])
     db.session.commit()
-    return ("", 204)
\ No newline at end of file
+    return ("", 204)
+
+# ---------- bulk ----------
+# Same contract as /tasks/bulk: one ownership query, batched writes, one commit,
+# one result per input item.
+
+@bp.post("/bulk")
+@login_required
+def bulk_create_subtasks():
+    items, error = bulk_items(request.get_json(silent=True))
+    if error:
+        return jsonify(error=error), 400
+
+    owned = owned_task_projects(d.get("task_id") for d in items if isinstance(d, dict))
+    ranks = Appender(Subtask)
+    results = [None] * len(items)
+    rows, slots = [], []
+    for n, data in enumerate(items):
+        if not isinstance(data, dict):
+            results[n] = item_error(n, 400, "item must be an object")
+            continue
+        task_id = as_id(data.get("task_id"))
+        title = text(data.get("title"))
+        if not task_id or not title:
+            results[n] = item_error(n, 400, "task_id and title are required")
+        elif task_id not in owned:
+            results[n] = item_error(n, 404, "task not found")
+        else:
+            rows.append({"task_id": task_id, "owner_id": current_user.id, "title": title, "status": "todo",
+                         "rank": ranks.next(task_id)})
+            slots.append(n)
+
+    if rows:
+        created = insert_returning(Subtask, rows)
+        tally = Tally()
+        for n, st in zip(slots, created):
+            results[n] = item_ok(n, 201, data=st.to_dict())
+            tally.subtask(st.task_id, owned[st.task_id], st.status)
+        tally.apply()
+        subtasks_changed(*{(r["task_id"], owned[r["task_id"]]) for r in rows})
+        emit_by_project("subtask.created", ((owned[st.task_id], st.to_dict()) for st in created))
+        db.session.commit()
+    return jsonify(results=results), 200
+
+@bp.patch("/bulk")
+@login_required
+def bulk_update_subtasks():
+    items, error = bulk_items(request.get_json(silent=True))
+    if error:
+        return jsonify(error=error), 400
+
+    owned = owned_subtasks(d.get("id") for d in items if isinstance(d, dict))
+    results = [None] * len(items)
+    rows, slots = [], []
+    seen = set()  # a repeated id would have its counter change tallied twice
+    for n, data in enumerate(items):
+        if not isinstance(data, dict):
+            results[n] = item_error(n, 400, "item must be an object")
+            continue
+        subtask_id = as_id(data.get("id"))
+        if subtask_id not in owned:
+            results[n] = item_error(n, 404, "subtask not found")
+            continue
+        if subtask_id in seen:
+            results[n] = item_error(n, 400, "duplicate id")
+            continue
+        seen.add(subtask_id)
+        row = {"id": subtask_id}
+        if text(data.get("title")):
+            row["title"] = text(data.get("title"))
+        if "status" in data:
+            row["status"] = text(data.get("status"))
+            if row["status"] not in VALID_STATUS:
+                results[n] = item_error(n, 400, "invalid status")
+                continue
+        rows.append(row)
+        slots.append(n)
+
+    changed = [r for r in rows if len(r) > 1]
+    if changed:
+        tally = Tally()
+        for r in changed:
+            st = owned[r["id"]]
+            tally.subtask(st.task_id, st.task.project_id, st.status, -1)
+            tally.subtask(st.task_id, st.task.project_id, r.get("status", st.status))
+        db.session.execute(update(Subtask), changed)
+        tally.apply()
+    if rows:
+        fresh = {st.id: st for st in Subtask.query.filter(Subtask.id.in_([r["id"] for r in rows])).populate_existing()}
+        for n, row in zip(slots, rows):
+            results[n] = item_ok(n, 200, data=fresh[row["id"]].to_dict())
+        subtasks_changed(*{(owned[r["id"]].task_id, owned[r["id"]].task.project_id) for r in changed})
+        emit_by_project("subtask.updated", ((owned[r["id"]].task.project_id, fresh[r["id"]].to_dict()) for r in changed))
+        db.session.commit()
+    return jsonify(results=results), 200
+
+@bp.delete("/bulk")
+@login_required
+def bulk_delete_subtasks():
+    ids, error = bulk_items(request.get_json(silent=True), key="ids")
+    if error:
+        return jsonify(error=error), 400
+
+    owned = owned_subtasks(ids)
+    results = []
+    for n, raw in enumerate(ids):
+        subtask_id = as_id(raw)
+        if subtask_id in owned:
+            results.append(item_ok(n, 204, id=subtask_id))
+        else:
+            results.append(item_error(n, 404, "subtask not found"))
+
+    if owned:
+        db.session.execute(delete(Subtask).where(Subtask.id.in_(list(owned))))
+        tally = Tally()
+        for st in owned.values():
+            tally.subtask(st.task_id, st.task.project_id, st.status, -1)
+        tally.apply()
+        subtasks_changed(*{(st.task_id, st.task.project_id) for st in owned.values()})
+        deleted("subtask", current_user.id, *owned)
+        emit_by_project("subtask.deleted", ((st.task.project_id, {"id": st.id, "task_id": st.task_id}) for st in owned.values()))
+        db.session.commit()
+    return jsonify(results=results), 200
@@ -0,0 +1,24 @@
+# routes/sync.py
+from datetime import timedelta
+from flask import Blueprint, current_app, request, jsonify
+from flask_login import login_required, current_user
+from utils.pagination import InvalidCursor
+from utils.sync import changes_since, CursorExpired
+
+bp = Blueprint("sync", __name__)
+
+@bp.get("")
+@login_required
+def sync():
+    # rows changed since `since` (omit it for a full snapshot); keep calling with
+    # the returned cursor while has_more is true
+    limit = min(1000, max(1, request.args.get("limit", default=500, type=int)))
+    retention = timedelta(days=current_app.config["SYNC_TOMBSTONE_DAYS"])
+    try:
+        payload = changes_since(current_user.id, request.args.get("since") or None,
+                                limit=limit, retention=retention)
+    except InvalidCursor:
+        return jsonify(error="invalid cursor"), 400
+    except CursorExpired:
+        return jsonify(error="cursor expired, sync again without since"), 410
+    return jsonify(payload), 200
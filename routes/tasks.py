@@ -1,27 +1,71 @@
 # routes/tasks.py
+from datetime import date, timedelta
 from flask import Blueprint, request, jsonify, abort
 from flask_login import login_required, current_user
-from sqlalchemy import asc, desc
-from models import db, Task, Project
-from utils.pagination import paginate
+from sqlalchemy import asc, desc, func, select, update, delete
+from models import db, Project, Task, TASK_STATUSES, TASK_PRIORITIES, purging_projects
+from utils.authz import require_project, require_task, owned_project_ids, owned_tasks
+from utils.cache import cache, request_key
+from utils.changes import tasks_changed, task_list_tag, deleted, emit, emit_by_project
+from utils.counters import Tally
+from utils.conditional import etag_for, not_modified, tagged
+from utils.bulk import bulk_items, insert_returning, as_id, text, item_ok, item_error
+from utils.dates import parse_day, DAY_ERROR
+from utils.fields import requested, InvalidFields
+from utils.pagination import paginate, keyset_paginate, InvalidCursor
+from utils.ranks import Appender, place, placement
 
 bp = Blueprint("tasks", __name__)
 
-VALID_STATUS = {"todo", "in_progress", "done"}
-VALID_PRIORITY = {"low", "normal", "high"}
-VALID_SORT = {"created_at", "due_date", "priority", "status", "title"}
+VALID_STATUS = set(TASK_STATUSES)
+VALID_PRIORITY = set(TASK_PRIORITIES)
+VALID_SORT = {"created_at", "due_date", "priority", "status", "title", "manual"}
 
-def user_owns_project(project_id: int) -> bool:
-    if not project_id:
-        return False
-    p = Project.query.get(project_id)
-    return bool(p and p.owner_id == current_user.id)
+# filter/sort/page a project's tasks from list_tasks query args (shared with /projects/<id>/tree);
+# returns (payload, None) or (None, error message)
+def task_page(project_id: int, args, serializer=lambda t: t.to_dict(), options=(), columns=(), fields=None):
+    # columns: select just these (rows instead of Task objects; pair with a row serializer);
+    # fields: a ?fields= Projection, which supplies both
+    page = max(1, args.get("page", default=1, type=int))
+    per_page = min(50, max(1, args.get("per_page", default=10, type=int)))
+    status = (args.get("status") or "all").strip()
+    sort = (args.get("sort") or "due_date").strip()
+    if sort not in VALID_SORT:
+        sort = "due_date"
+    # manual: the drag-and-drop order (POST /tasks/<id>/move), straight off ix_tasks_project_rank
+    sort_col = Task.rank if sort == "manual" else getattr(Task, sort)
+    if fields is not None:
+        # keyset paging reads the sort key back off the last row
+        columns = fields.select(sort_col, Task.id) if "cursor" in args else fields.select()
+        serializer = fields.row_dict
+
+    q = Task.query.filter_by(project_id=project_id)
+    if columns:
+        q = q.with_entities(*columns)
+    if options:
+        q = q.options(*options)
+    if status != "all":
+        if status not in VALID_STATUS:
+            return None, "invalid status"
+        q = q.filter(Task.status == status)
+
+    # cursor mode: `?cursor=` (empty for the first page) switches to keyset paging;
+    # the total is only counted when asked for with `with_total=1`
+    if "cursor" in args:
+        try:
+            return keyset_paginate(
+                q, [sort_col, Task.id],
+                cursor=args.get("cursor") or None,
+                per_page=per_page,
+                with_total=args.get("with_total") in ("1", "true"),
+                serializer=serializer,
+            ), None
+        except InvalidCursor:
+            return None, "invalid cursor"
 
-def task_visible_to_user(task: Task) -> bool:
-    if not task:
-        return False
-    p = Project.query.get(task.project_id)
-    return bool(p and p.owner_id == current_user.id)
+    # default ascending for due_date; created_at newest first is also fine — keep asc for consistency
+    q = q.order_by(asc(sort_col), Task.id.asc())
+    return paginate(q, page=page, per_page=per_page, serializer=serializer), None
 
 @bp.get("")
 @login_required
@@ -29,26 +73,112 @@ def list_tasks():
     project_id = request.args.get("project_id", type=int)
     if not project_id:
         return jsonify(error="project_id is required"), 400
-    if not user_owns_project(project_id):
-        abort(404)
+    p = require_project(project_id)
+    etag = etag_for(f"p{p.id}", p.version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    try:
+        fields = requested(Task, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
+    key = request_key("tasks", p.id, f"v{p.version}")  # a stale or raced copy never matches a newer ETag
+    payload = cache.get(key)
+    if payload is None:
+        payload, error = task_page(project_id, request.args, serializer=Task.row_dict, columns=Task.LIST_COLUMNS,
+                                   fields=fields)
+        if error:
+            return jsonify(error=error), 400
+        cache.set(key, payload, tags=[task_list_tag(p.id)])
+    return tagged(jsonify(payload), etag), 200
 
-    page = max(1, request.args.get("page", default=1, type=int))
-    per_page = min(50, max(1, request.args.get("per_page", default=10, type=int)))
+DUE_WINDOW_DAYS = 7
+
+# version stamp for cross-project task views: any task write bumps its project's
+# version, so count + sum over the user's projects changes whenever one does
+def owner_tasks_version(user_id: int) -> str:
+    count, total = (
+        db.session.query(func.count(Project.id), func.coalesce(func.sum(Project.version), 0))
+        .filter(Project.owner_id == user_id, Project.deleted_at.is_(None)).one()
+    )
+    return f"{count}.{total}"
+
+@bp.get("/due")
+@login_required
+def due_tasks():
+    # tasks due in [from, to] (default: the 7 days from today) across all of the
+    # user's projects, soonest first; overdue=1 instead lists open tasks due before
+    # today. One range scan on ix_tasks_owner_due.
+    today = date.today()
+    try:
+        start = parse_day(request.args.get("from"))
+        end = parse_day(request.args.get("to"))
+    except ValueError:
+        return jsonify(error="from and to must be YYYY-MM-DD dates"), 400
+    overdue = request.args.get("overdue") in ("1", "true")
     status = (request.args.get("status") or "all").strip()
-    sort = (request.args.get("sort") or "due_date").strip()
-    if sort not in VALID_SORT:
-        sort = "due_date"
+    if status != "all" and status not in VALID_STATUS:
+        return jsonify(error="invalid status"), 400
+    per_page = min(100, max(1, request.args.get("per_page", default=50, type=int)))
+    try:
+        fields = requested(Task, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
 
-    q = Task.query.filter_by(project_id=project_id)
+    # the window moves with the date
+    etag = etag_for(f"u{current_user.id}-due", f"{owner_tasks_version(current_user.id)}.{today.isoformat()}")
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    q = Task.query.filter(Task.owner_id == current_user.id, Task.project_id.not_in(purging_projects(current_user.id)))
+    if overdue:
+        q = q.filter(Task.due_date < today, Task.status != "done")
+    else:
+        start = start or today
+        end = end or start + timedelta(days=DUE_WINDOW_DAYS - 1)
+        if end < start:
+            return jsonify(error="to must not be before from"), 400
+        q = q.filter(Task.due_date >= start, Task.due_date <= end)
     if status != "all":
-        if status not in VALID_STATUS:
-            return jsonify(error="invalid status"), 400
         q = q.filter(Task.status == status)
+    serializer = lambda t: t.to_dict()
+    if fields is not None:
+        q = q.with_entities(*fields.select(Task.due_date, Task.id))
+        serializer = fields.row_dict
 
-    sort_col = getattr(Task, sort)
-    # default ascending for due_date; created_at newest first is also fine — keep asc for consistency
-    q = q.order_by(asc(sort_col))
-    return jsonify(paginate(q, page=page, per_page=per_page, serializer=lambda t: t.to_dict())), 200
+    try:
+        payload = keyset_paginate(
+            q, [Task.due_date, Task.id],
+            cursor=request.args.get("cursor") or None,
+            per_page=per_page,
+            with_total=request.args.get("with_total") in ("1", "true"),
+            serializer=serializer,
+        )
+    except InvalidCursor:
+        return jsonify(error="invalid cursor"), 400
+    if not overdue:
+        payload["meta"].update({"from": start.isoformat(), "to": end.isoformat()})
+    return tagged(jsonify(payload), etag), 200
+
+@bp.get("/<int:task_id>")
+@login_required
+def get_task(task_id: int):
+    try:
+        fields = requested(Task, request.args)
+    except InvalidFields as e:
+        return jsonify(error=str(e)), 400
+    if fields is None:
+        return jsonify(require_task(task_id).to_dict()), 200
+    # owner_id mirrors the project's owner, so this one select also authorizes
+    row = db.session.execute(
+        select(*fields.columns).where(Task.id == task_id, Task.owner_id == current_user.id,
+                                      Task.project_id.not_in(purging_projects(current_user.id)))
+    ).first()
+    if row is None:
+        abort(404)
+    return jsonify(fields.row_dict(row)), 200
 
 @bp.post("")
 @login_required
@@ -56,38 +186,44 @@ def create_task():
     data = request.get_json(silent=True) or {}
     project_id = data.get("project_id")
     title = (data.get("title") or "").strip()
-    due_date = (data.get("due_date") or None)
     priority = (data.get("priority") or "normal").strip()
     status = (data.get("status") or "todo").strip()
 
     if not project_id or not title:
         return jsonify(error="project_id and title are required"), 400
-    if not user_owns_project(project_id):
-        abort(404)
+    require_project(project_id)
     if priority not in VALID_PRIORITY:
         return jsonify(error="invalid priority"), 400
     if status not in VALID_STATUS:
         return jsonify(error="invalid status"), 400
+    try:
+        due_date = parse_day(data.get("due_date"))
+    except ValueError:
+        return jsonify(error=DAY_ERROR), 400
 
-    t = Task(project_id=project_id, title=title, priority=priority, status=status)
-    if due_date:
-        t.due_date = due_date  # ISO yyyy-mm-dd string works with SQLite adapter
+    t = Task(project_id=project_id, owner_id=current_user.id, title=title, priority=priority,
+             status=status, due_date=due_date, rank=Appender(Task).next(project_id))
     db.session.add(t)
+    Tally().task(project_id, status, priority).apply()
+    tasks_changed(project_id)
+    emit(project_id, "task.created", [t.to_dict()])
     db.session.commit()
     return jsonify(t.to_dict()), 201
 
 @bp.patch("/<int:task_id>")
 @login_required
 def update_task(task_id: int):
-    t = Task.query.get(task_id)
-    if not task_visible_to_user(t):
-        abort(404)
+    t = require_task(task_id)
+    before = (t.status, t.priority)
 
     data = request.get_json(silent=True) or {}
     if "title" in data:
         t.title = (data.get("title") or "").strip() or t.title
     if "due_date" in data:
-        t.due_date = data.get("due_date") or None
+        try:
+            t.due_date = parse_day(data.get("due_date"))
+        except ValueError:
+            return jsonify(error=DAY_ERROR), 400
     if "priority" in data:
         val = (data.get("priority") or "").strip()
         if val and val in VALID_PRIORITY:
@@ -97,15 +233,192 @@ def update_task(task_id: int):
         if val and val in VALID_STATUS:
             t.status = val
 
+    Tally().task(t.project_id, *before, -1).task(t.project_id, t.status, t.priority).apply()
+    tasks_changed(t.project_id)
+    emit(t.project_id, "task.updated", [t.to_dict()])
+    db.session.commit()
+    return jsonify(t.to_dict()), 200
+
+@bp.post("/<int:task_id>/move")
+@login_required
+def move_task(task_id: int):
+    # manual order: {"after_id": <task>} puts it right after that task (null: first),
+    # {"before_id": <task>} right before it (null: last); writes just this row
+    t = require_task(task_id)
+    try:
+        anchor_id, after_anchor = placement(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if anchor_id == t.id:
+        return jsonify(error="cannot move a task relative to itself"), 400
+    tasks_changed(t.project_id)  # the project row first: the rebalancer locks in this order too
+    try:
+        t.rank, respread = place(Task, t.project_id, t.id, anchor_id, after_anchor)
+    except LookupError:
+        return jsonify(error="task to move next to not found in this project"), 404
+    if respread:
+        emit(t.project_id, "tasks.reordered", [])
+    else:
+        emit(t.project_id, "task.updated", [t.to_dict()])
     db.session.commit()
     return jsonify(t.to_dict()), 200
 
 @bp.delete("/<int:task_id>")
 @login_required
 def delete_task(task_id: int):
-    t = Task.query.get(task_id)
-    if not task_visible_to_user(t):
-        abort(404)
-    db.session.delete(t)
+    t = require_task(task_id)
+    db.session.delete(t)  # subtasks: ON DELETE CASCADE
+    Tally().task_removed(t).apply()
+    tasks_changed(t.project_id)
+    deleted("task", current_user.id, t.id)
+    emit(t.project_id, "task.deleted", [{"id": t.id}])
     db.session.commit()
-    return ("", 204)
\ No newline at end of file
+    return ("", 204)
+
+# ---------- bulk ----------
+# All rows of a request are authorized with one query and written with batched
+# (executemany) statements in a single transaction; bad items are reported per
+# index and skipped, the rest still go through.
+
+@bp.post("/bulk")
+@login_required
+def bulk_create_tasks():
+    items, error = bulk_items(request.get_json(silent=True))
+    if error:
+        return jsonify(error=error), 400
+
+    owned = owned_project_ids(d.get("project_id") for d in items if isinstance(d, dict))
+    ranks = Appender(Task)
+    results = [None] * len(items)
+    rows, slots = [], []
+    for n, data in enumerate(items):
+        if not isinstance(data, dict):
+            results[n] = item_error(n, 400, "item must be an object")
+            continue
+        project_id = as_id(data.get("project_id"))
+        title = text(data.get("title"))
+        priority = text(data.get("priority") or "normal")
+        status = text(data.get("status") or "todo")
+        try:
+            due_date = parse_day(data.get("due_date"))
+        except ValueError:
+            results[n] = item_error(n, 400, DAY_ERROR)
+            continue
+        if not project_id or not title:
+            results[n] = item_error(n, 400, "project_id and title are required")
+        elif project_id not in owned:
+            results[n] = item_error(n, 404, "project not found")
+        elif priority not in VALID_PRIORITY:
+            results[n] = item_error(n, 400, "invalid priority")
+        elif status not in VALID_STATUS:
+            results[n] = item_error(n, 400, "invalid status")
+        else:
+            rows.append({"project_id": project_id, "owner_id": current_user.id, "title": title,
+                         "priority": priority, "status": status, "due_date": due_date,
+                         "rank": ranks.next(project_id)})
+            slots.append(n)
+
+    if rows:
+        created = insert_returning(Task, rows)
+        tally = Tally()
+        for n, t in zip(slots, created):
+            results[n] = item_ok(n, 201, data=t.to_dict())
+            tally.task(t.project_id, t.status, t.priority)
+        tally.apply()
+        tasks_changed(*{r["project_id"] for r in rows})
+        emit_by_project("task.created", ((t.project_id, t.to_dict()) for t in created))
+        db.session.commit()
+    return jsonify(results=results), 200
+
+@bp.patch("/bulk")
+@login_required
+def bulk_update_tasks():
+    items, error = bulk_items(request.get_json(silent=True))
+    if error:
+        return jsonify(error=error), 400
+
+    owned = owned_tasks(d.get("id") for d in items if isinstance(d, dict))
+    results = [None] * len(items)
+    rows, slots = [], []
+    seen = set()  # a repeated id would have its counter change tallied twice
+    for n, data in enumerate(items):
+        if not isinstance(data, dict):
+            results[n] = item_error(n, 400, "item must be an object")
+            continue
+        task_id = as_id(data.get("id"))
+        if task_id not in owned:
+            results[n] = item_error(n, 404, "task not found")
+            continue
+        if task_id in seen:
+            results[n] = item_error(n, 400, "duplicate id")
+            continue
+        seen.add(task_id)
+        row = {"id": task_id}
+        if text(data.get("title")):
+            row["title"] = text(data.get("title"))
+        if "due_date" in data:
+            try:
+                row["due_date"] = parse_day(data.get("due_date"))
+            except ValueError:
+                results[n] = item_error(n, 400, DAY_ERROR)
+                continue
+        if "priority" in data:
+            row["priority"] = text(data.get("priority"))
+            if row["priority"] not in VALID_PRIORITY:
+                results[n] = item_error(n, 400, "invalid priority")
+                continue
+        if "status" in data:
+            row["status"] = text(data.get("status"))
+            if row["status"] not in VALID_STATUS:
+                results[n] = item_error(n, 400, "invalid status")
+                continue
+        rows.append(row)
+        slots.append(n)
+
+    changed = [r for r in rows if len(r) > 1]
+    if changed:
+        tally = Tally()
+        for r in changed:
+            t = owned[r["id"]]
+            tally.task(t.project_id, t.status, t.priority, -1)
+            tally.task(t.project_id, r.get("status", t.status), r.get("priority", t.priority))
+        # ORM bulk UPDATE by primary key: rows sharing a key set go out as one executemany
+        db.session.execute(update(Task), changed)
+        tally.apply()
+    if rows:
+        fresh = {t.id: t for t in Task.query.filter(Task.id.in_([r["id"] for r in rows])).populate_existing()}
+        for n, row in zip(slots, rows):
+            results[n] = item_ok(n, 200, data=fresh[row["id"]].to_dict())
+        tasks_changed(*{owned[r["id"]].project_id for r in changed})
+        emit_by_project("task.updated", ((fresh[r["id"]].project_id, fresh[r["id"]].to_dict()) for r in changed))
+        db.session.commit()
+    return jsonify(results=results), 200
+
+@bp.delete("/bulk")
+@login_required
+def bulk_delete_tasks():
+    ids, error = bulk_items(request.get_json(silent=True), key="ids")
+    if error:
+        return jsonify(error=error), 400
+
+    owned = owned_tasks(ids)
+    results = []
+    for n, raw in enumerate(ids):
+        task_id = as_id(raw)
+        if task_id in owned:
+            results.append(item_ok(n, 204, id=task_id))
+        else:
+            results.append(item_error(n, 404, "task not found"))
+
+    if owned:
+        task_ids = list(owned)
+        db.session.execute(delete(Task).where(Task.id.in_(task_ids)))
+        tally = Tally()
+        for t in owned.values():
+            tally.task_removed(t)
+        tally.apply()
+        tasks_changed(*{t.project_id for t in owned.values()})
+        deleted("task", current_user.id, *task_ids)
+        emit_by_project("task.deleted", ((t.project_id, {"id": t.id}) for t in owned.values()))
+        db.session.commit()
+    return jsonify(results=results), 200
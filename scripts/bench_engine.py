@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Concurrent read/write throughput per database engine profile, in-process
+# (Flask test client).
+#
+#   python scripts/bench_engine.py --profiles dev,sqlite-wal --readers 8 --writers 2 --seconds 5
+#   DATABASE_URL=postgresql://... python scripts/bench_engine.py --profiles postgres-prod
+#
+# Without a Postgres DATABASE_URL every profile gets a fresh SQLite file; with
+# one, it is used as is. Readers page through a project's tasks (read cache
+# off, so every request hits the database) while writers create and update
+# tasks in the same project. Failed requests (e.g. "database is locked" -> 500) are
+# counted, not retried.
+import argparse, os, sys, tempfile, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def bench(profile, readers, writers, seconds, seed_tasks):
+    env = {"BCRYPT_LOG_ROUNDS": "4", "CACHE_BACKEND": "none", "DB_PROFILE": profile}
+    if not os.getenv("DATABASE_URL", "").startswith("postgres"):
+        tmp = tempfile.mkdtemp(prefix="bench_engine_")
+        env["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ.update(env)
+    from app import create_app
+    app = create_app()
+
+    creds = {"email": "bench@example.com", "password": "pw12345!"}
+    app.test_client().post("/auth/signup", json={"username": "bench", **creds})
+    owner = app.test_client()
+    owner.post("/auth/login", json=creds)
+    pid = owner.post("/projects", json={"title": "bench"}).json["id"]
+    owner.post("/tasks/bulk", json=[{"project_id": pid, "title": f"seed {i}"} for i in range(seed_tasks)])
+
+    stats = {"read": [], "write": [], "errors": 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client():
+        c = app.test_client()
+        c.post("/auth/login", json=creds)
+        return c
+
+    def reader():
+        c, page, lat = client(), 1, []
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            r = c.get(f"/tasks?project_id={pid}&page={page}&per_page=50")
+            lat.append(time.perf_counter() - t0)
+            page = page % 4 + 1
+            if r.status_code != 200:
+                with lock:
+                    stats["errors"] += 1
+        with lock:
+            stats["read"] += lat
+
+    def writer():
+        c, n, lat = client(), 0, []
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            r = c.post("/tasks", json={"project_id": pid, "title": f"w{n}"})
+            if r.status_code == 201:
+                r = c.patch(f"/tasks/{r.json['id']}", json={"status": "in_progress"})
+            lat.append(time.perf_counter() - t0)
+            n += 1
+            if r.status_code not in (200, 201):
+                with lock:
+                    stats["errors"] += 1
+        with lock:
+            stats["write"] += lat
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + \
+              [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="concurrent read/write throughput per engine profile")
+    ap.add_argument("--profiles", default="dev,sqlite-wal")
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--seed-tasks", type=int, default=500)
+    args = ap.parse_args()
+
+    print(f"{'profile':<14}  {'reads/s':>8}  {'read p95':>9}  {'writes/s':>8}  {'write p95':>9}  {'errors':>6}")
+    for profile in args.profiles.split(","):
+        elapsed, s = bench(profile, args.readers, args.writers, args.seconds, args.seed_tasks)
+        print(f"{profile:<14}  {len(s['read']) / elapsed:>8.1f}  {percentile(s['read'], 0.95) * 1000:>7.1f}ms"
+              f"  {len(s['write']) / elapsed:>8.1f}  {percentile(s['write'], 0.95) * 1000:>7.1f}ms  {s['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
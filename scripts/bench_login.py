@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# Login throughput at different bcrypt costs, in-process (Flask test client).
+#
+#   python scripts/bench_login.py --costs 4,8,10,12 --clients 8 --logins 64
+#
+# Each cost gets a fresh SQLite database and app; `--clients` threads then log
+# in `--logins` times in total. 503s (hashing backlog full) are counted, not
+# retried, so the table also shows how much load the pool sheds.
+import argparse, os, sys, tempfile, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def bench(cost, clients, logins, workers, queue_limit):
+    tmp = tempfile.mkdtemp(prefix="bench_login_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        "BCRYPT_LOG_ROUNDS": str(cost),
+        "HASH_WORKERS": str(workers),
+        "HASH_QUEUE_LIMIT": str(queue_limit),
+        "CACHE_BACKEND": "none",
+    })
+    from app import create_app
+    app = create_app()
+
+    creds = {"email": "bench@example.com", "password": "pw12345!"}
+    app.test_client().post("/auth/signup", json={"username": "bench", **creds})
+
+    codes, lock = {}, threading.Lock()
+    per_client = max(1, logins // clients)
+
+    def worker():
+        c = app.test_client()
+        for _ in range(per_client):
+            code = c.post("/auth/login", json=creds).status_code
+            with lock:
+                codes[code] = codes.get(code, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, codes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="login throughput per bcrypt cost")
+    ap.add_argument("--costs", default="4,8,10,12")
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--logins", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--queue-limit", type=int, default=16)
+    args = ap.parse_args()
+
+    print(f"{'cost':>4}  {'logins/s':>9}  {'ok':>5}  {'503':>5}  {'secs':>7}")
+    for cost in (int(c) for c in args.costs.split(",")):
+        elapsed, codes = bench(cost, args.clients, args.logins, args.workers, args.queue_limit)
+        ok, busy = codes.get(200, 0), codes.get(503, 0)
+        print(f"{cost:>4}  {ok / elapsed:>9.1f}  {ok:>5}  {busy:>5}  {elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,9 +17,12 @@ def uniq_user(prefix="u"):
     return f"{prefix}_{sfx}", f"{prefix}_{sfx}@example.com", "pw12345!"
 
 class Tester:
-    def __init__(self, base):
+    def __init__(self, base, session_factory=requests.Session):
+        # session_factory: anything returning a requests.Session look-alike
+        # (scripts/loadtest.py passes one that drives the Flask test client)
         self.base = base.rstrip("/")
-        self.s = requests.Session()
+        self.session_factory = session_factory
+        self.s = session_factory()
         self.s.headers.update({"Content-Type": "application/json"})
         self.pass_count = 0
         self.fail_count = 0
@@ -71,6 +74,12 @@ class Tester:
             _, _ = self.expect("login A", "POST", "/auth/login", expected=200,
                                json={"email": email, "password": pw})
 
+        # bcrypt reads at most 72 bytes: longer passwords are a 400, not a 500
+        self.expect("signup with over-long password", "POST", "/auth/signup", expected=400,
+                    json={"username": uname + "_long", "email": "long_" + email, "password": "x" * 100})
+        self.expect("login with over-long password", "POST", "/auth/login", expected=400,
+                    json={"email": email, "password": "x" * 100})
+
         # cookie set?
         set_cookie = r.headers.get("Set-Cookie", "")
         if "session" in set_cookie.lower():
@@ -144,7 +153,40 @@ class Tester:
             if ok: self.pass_count += 1; _ok(f"filter {s} returned only {s}")
             else: self.fail_count += 1; _fail(f"filter {s} returned mixed statuses")
 
-        # Update first task 
+        # Bulk update: a repeated id is rejected, and the counters still match the rows
+        if len(created_task_ids) >= 2:
+            a, b = created_task_ids[0], created_task_ids[1]
+            _, resp = self.expect("bulk update tasks", "PATCH", "/tasks/bulk", expected=200,
+                                  json=[{"id": a, "status": "done"}, {"id": a, "status": "in_progress"},
+                                        {"id": b, "priority": "low"}])
+            codes = [r.get("status") for r in (resp or {}).get("results", [])]
+            if codes == [200, 400, 200]: self.pass_count += 1; _ok("bulk update rejects a repeated id")
+            else: self.fail_count += 1; _fail(f"bulk update results wrong: {codes}")
+            _, stats = self.expect("project stats", "GET", f"/projects/{proj_id}/stats", expected=200)
+            _, resp = self.expect("tasks for stats", "GET", f"/tasks?project_id={proj_id}&per_page=50&status=all",
+                                  expected=200)
+            rows = (resp or {}).get("data", [])
+            counted = {s: sum(t.get("status") == s for t in rows) for s in statuses}
+            if (stats or {}).get("stats", {}).get("tasks", {}).get("by_status") == counted:
+                self.pass_count += 1; _ok("stats match the rows after bulk update")
+            else:
+                self.fail_count += 1; _fail(f"stats {(stats or {}).get('stats')} vs rows {counted}")
+
+        # Manual order: move the last task to the top, then after the (new) second one
+        if len(created_task_ids) >= 3:
+            last, second = created_task_ids[-1], created_task_ids[1]
+            self.expect("move task to top", "POST", f"/tasks/{last}/move", expected=200, json={"after_id": None})
+            self.expect("move task after another", "POST", f"/tasks/{created_task_ids[0]}/move", expected=200,
+                        json={"after_id": second})
+            _, resp = self.expect("tasks sort=manual", "GET",
+                                  f"/tasks?project_id={proj_id}&per_page=50&sort=manual", expected=200)
+            order = [t.get("id") for t in (resp or {}).get("data", [])]
+            expected_order = [last] + created_task_ids[1:2] + created_task_ids[:1] + created_task_ids[2:-1]
+            if order == expected_order: self.pass_count += 1; _ok("manual order follows moves")
+            else: self.fail_count += 1; _fail(f"manual order wrong: {order}")
+            self.expect("move relative to itself", "POST", f"/tasks/{last}/move", expected=400, json={"before_id": last})
+
+        # Update first task
         if created_task_ids:
             t_id = created_task_ids[0]
             _, d = self.expect("update task fields", "PATCH", f"/tasks/{t_id}", expected=200,
@@ -175,7 +217,7 @@ class Tester:
                     self.fail_count += 1; _fail("subtask still present after delete")
 
         # Ownership checks: new user B cannot access A's project
-        s2 = Tester(self.base)  # separate session
+        s2 = Tester(self.base, self.session_factory)  # separate session
         unameB, emailB, pwB = uniq_user("userB")
         s2.expect("signup B", "POST", "/auth/signup", expected=201,
                   json={"username":unameB,"email":emailB,"password":pwB})
@@ -197,6 +239,40 @@ class Tester:
             else:
                 self.fail_count += 1; _fail("task still present after delete")
 
+        # Delete projects: tasks and subtasks go with them (ON DELETE CASCADE)
+        def _project_tree(title):
+            _, p = self.expect(f"create project {title}", "POST", "/projects", expected=201, json={"title": title})
+            pid = (p or {}).get("id")
+            _, t = self.expect(f"create task in {title}", "POST", "/tasks", expected=201,
+                               json={"project_id": pid, "title": f"{title} task"})
+            tid = (t or {}).get("id")
+            _, st = self.expect(f"create subtask in {title}", "POST", "/subtasks", expected=201,
+                                json={"task_id": tid, "title": f"{title} subtask"})
+            return pid, tid, (st or {}).get("id")
+
+        pid, tid, sid = _project_tree("Cascade")
+        self.expect("delete project", "DELETE", f"/projects/{pid}", expected=204)
+        self.expect("its task is gone", "GET", f"/tasks/{tid}", expected=404)
+        self.expect("its subtask is gone", "GET", f"/subtasks/{sid}", expected=404)
+
+        # ...or, with ?background=1, hidden at once (202) and purged by a worker
+        pid, tid, sid = _project_tree("Purge")
+        _, d = self.expect("delete project in the background", "DELETE",
+                           f"/projects/{pid}?background=1", expected=202)
+        if d and d.get("id") == pid and d.get("status") == "purging":
+            self.pass_count += 1; _ok("background delete reports purging")
+        else:
+            self.fail_count += 1; _fail(f"background delete body wrong: {d}")
+        self.expect("purging project is 404", "GET", f"/projects/{pid}", expected=404)
+        self.expect("purging project's task is 404", "GET", f"/tasks/{tid}", expected=404)
+        self.expect("purging project's task is 404 with fields=", "GET", f"/tasks/{tid}?fields=id,title", expected=404)
+        self.expect("purging project's subtask is 404", "GET", f"/subtasks/{sid}", expected=404)
+        _, arr = self.expect("list projects after deletes", "GET", "/projects", expected=200)
+        if isinstance(arr, list) and not any(p.get("title") in ("Cascade", "Purge") for p in arr):
+            self.pass_count += 1; _ok("deleted projects left the list")
+        else:
+            self.fail_count += 1; _fail("deleted project still listed")
+
         # Logout + ensure protected endpoints now blocked
         self.expect("logout", "POST", "/auth/logout", expected=204)
         _, me = self.expect("auth me (after logout)", "GET", "/auth/me", expected=200)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# Load test on top of the e2e Tester: seeds a dataset, then runs concurrent
+# virtual users doing a weighted mix of list/create/update/delete requests and
+# reports latency percentiles and throughput per endpoint.
+#
+#   python scripts/loadtest.py --users 4 --vusers 16 --duration 20
+#   python scripts/loadtest.py --api http://127.0.0.1:5005 --mix list=80,create=10,update=10
+#   python scripts/loadtest.py --save-baseline bench/baseline.json
+#   python scripts/loadtest.py --compare bench/baseline.json --threshold 25
+#
+# Without --api it runs in-process against the Flask test client (fresh SQLite
+# database, bcrypt cost 4, so signups don't dominate); with --api it talks to a
+# running server. --compare exits 1 when an endpoint's p95 got more than
+# --threshold percent slower than the baseline, or its throughput dropped by as
+# much. Note the in-process mode shares one interpreter (GIL) between the
+# virtual users and the app: use it to compare runs, not to size production.
+import argparse, json, os, random, re, sys, tempfile, threading, time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from e2e_test import Tester, uniq_user, _ok, _fail, YELLOW, RESET
+
+INPROCESS = "http://inprocess"
+DEFAULT_MIX = "list=70,create=12,update=12,delete=6"
+STATUSES = ("todo", "in_progress", "done")
+PRIORITIES = ("low", "normal", "high")
+
+
+# ---------- in-process transport ----------
+
+class AppResponse:
+    # the parts of requests.Response that Tester uses
+    def __init__(self, resp):
+        self.status_code = resp.status_code
+        self.headers = resp.headers
+        self.text = resp.get_data(as_text=True)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AppSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.headers = {}
+
+    def request(self, method, url, timeout=None, **kwargs):
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        if "json" not in kwargs:
+            headers.pop("Content-Type", None)
+        return AppResponse(self.client.open(path, method=method, headers=headers, **kwargs))
+
+
+def inprocess_app():
+    tmp = tempfile.mkdtemp(prefix="loadtest_")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp}/loadtest.db")
+    os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+    from app import create_app
+    return create_app()
+
+
+# ---------- stats ----------
+
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint(method: str, path: str) -> str:
+    # "GET /tasks/17?x=1" -> "GET /tasks/<id>"
+    return f"{method} {ID_SEGMENT.sub('/<id>', path.split('?', 1)[0])}"
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}   # endpoint -> [seconds]
+        self.errors = {}    # endpoint -> count
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed) -> dict:
+        out = {}
+        for name, values in sorted(self.samples.items()):
+            out[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+        return out
+
+
+# ---------- virtual users ----------
+
+class VirtualUser(Tester):
+    # one logged-in session; every request goes through Tester._req and is timed
+    def __init__(self, base, session_factory, stats, rng, account):
+        super().__init__(base, session_factory)
+        self.stats = stats
+        self.rng = rng
+        self.account = account          # (username, email, password)
+        self.projects = []              # project ids
+        self.tasks = []                 # task ids this user can touch
+        self.subtask_parents = []       # task ids known to have subtasks
+
+    def _req(self, method, path, expected=None, allow=None, **kwargs):
+        start = time.perf_counter()
+        ok, r, data = super()._req(method, path, expected=expected, allow=allow, **kwargs)
+        self.stats.record(endpoint(method, path), time.perf_counter() - start, ok)
+        return ok, r, data
+
+    def login(self):
+        _, email, pw = self.account
+        ok, r, _ = self._req("POST", "/auth/login", expected=200, json={"email": email, "password": pw})
+        if not ok:
+            raise RuntimeError(f"login failed ({r.status_code})")
+
+    def load_ids(self):
+        _, _, projects = self._req("GET", "/projects", expected=200)
+        self.projects = [p["id"] for p in projects or []]
+        for pid in self.projects:
+            _, _, page = self._req("GET", f"/tasks?project_id={pid}&per_page=100", expected=200)
+            self.tasks += [t["id"] for t in (page or {}).get("data", [])]
+        self.subtask_parents = self.tasks[: max(1, len(self.tasks) // 2)]
+
+    # operations; each picks its own target from what this user owns
+
+    def op_list(self):
+        kind = self.rng.random()
+        if kind < 0.15 or not self.projects:
+            self._req("GET", "/projects", expected=200)
+        elif kind < 0.65:
+            pid = self.rng.choice(self.projects)
+            status = self.rng.choice(("all",) + STATUSES)
+            self._req("GET", f"/tasks?project_id={pid}&per_page=20&status={status}&sort=due_date", expected=200)
+        elif kind < 0.85 and self.subtask_parents:
+            self._req("GET", f"/subtasks?task_id={self.rng.choice(self.subtask_parents)}", allow=[200, 404])
+        else:
+            self._req("GET", "/agenda?per_page=20", expected=200)
+
+    def op_create(self):
+        if not self.projects:
+            return
+        ok, _, d = self._req("POST", "/tasks", expected=201, json={
+            "project_id": self.rng.choice(self.projects),
+            "title": f"load {self.rng.randrange(10**6)}",
+            "priority": self.rng.choice(PRIORITIES),
+        })
+        if ok and d:
+            self.tasks.append(d["id"])
+
+    def op_update(self):
+        if not self.tasks:
+            return self.op_create()
+        self._req("PATCH", f"/tasks/{self.rng.choice(self.tasks)}", allow=[200, 404], json={
+            "status": self.rng.choice(STATUSES), "priority": self.rng.choice(PRIORITIES),
+        })
+
+    def op_delete(self):
+        if len(self.tasks) < 2:
+            return self.op_create()
+        task_id = self.tasks.pop(self.rng.randrange(len(self.tasks)))
+        if task_id in self.subtask_parents:
+            self.subtask_parents.remove(task_id)
+        self._req("DELETE", f"/tasks/{task_id}", allow=[204, 404])
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("list", "create", "update", "delete"):
+            raise SystemExit(f"unknown operation in --mix: {name!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ---------- dataset ----------
+
+def seed(base, session_factory, stats, users, projects, tasks, subtasks, rng):
+    # N users x projects x tasks x subtasks through the public API (bulk endpoints)
+    accounts = []
+    for _ in range(users):
+        account = uniq_user("load")
+        t = VirtualUser(base, session_factory, stats, rng, account)
+        ok, r, _ = t._req("POST", "/auth/signup", expected=201,
+                          json={"username": account[0], "email": account[1], "password": account[2]})
+        if not ok:
+            raise RuntimeError(f"signup failed ({r.status_code})")
+        for p in range(projects):
+            _, _, proj = t._req("POST", "/projects", expected=201, json={"title": f"Load project {p + 1}"})
+            task_ids = []
+            for start in range(0, tasks, 500):
+                batch = [{
+                    "project_id": proj["id"],
+                    "title": f"Task {n + 1}",
+                    "status": rng.choice(STATUSES),
+                    "priority": rng.choice(PRIORITIES),
+                    "due_date": f"2030-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.7 else None,
+                } for n in range(start, min(tasks, start + 500))]
+                _, _, res = t._req("POST", "/tasks/bulk", expected=200, json=batch)
+                task_ids += [x["data"]["id"] for x in (res or {}).get("results", []) if x.get("data")]
+            rows = [{"task_id": tid, "title": f"Step {k + 1}"} for tid in task_ids for k in range(subtasks)]
+            for start in range(0, len(rows), 500):
+                t._req("POST", "/subtasks/bulk", expected=200, json=rows[start:start + 500])
+        accounts.append(account)
+    return accounts
+
+
+# ---------- run ----------
+
+def run(base, session_factory, accounts, vusers, duration, mix, rng_seed):
+    stats = Stats()
+    ops, weights = list(mix), list(mix.values())
+    ready = threading.Barrier(vusers + 1)
+    failures = []
+
+    def worker(n):
+        rng = random.Random(rng_seed + n)
+        # login/load_ids are warm-up: timed into a throwaway Stats
+        vu = VirtualUser(base, session_factory, Stats(), rng, accounts[n % len(accounts)])
+        try:
+            vu.login()
+            vu.load_ids()
+        except Exception as e:  # report it, but don't leave the barrier hanging
+            failures.append(str(e))
+        ready.wait()
+        vu.stats = stats
+        stop = time.monotonic() + duration
+        while time.monotonic() < stop and not failures:
+            getattr(vu, f"op_{rng.choices(ops, weights)[0]}")()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(vusers)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    if failures:
+        raise RuntimeError(failures[0])
+    return time.perf_counter() - start, stats
+
+
+def print_report(summary, elapsed, baseline=None):
+    total = sum(s["requests"] for s in summary.values())
+    errors = sum(s["errors"] for s in summary.values())
+    print(f"\n{'endpoint':<32} {'reqs':>6} {'err':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, s in summary.items():
+        line = (f"{name:<32} {s['requests']:>6} {s['errors']:>4} {s['rps']:>8.1f} "
+                f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+        base = (baseline or {}).get(name)
+        if base:
+            line += f"   (baseline p95 {base['p95_ms']:.1f}, rps {base['rps']:.1f})"
+        print(line)
+    print(f"\n{total} requests, {errors} errors in {elapsed:.1f}s = {total / elapsed:.1f} req/s")
+
+
+def regressions(summary, baseline, threshold):
+    # endpoints present in both runs whose p95 or throughput moved past the threshold
+    found = []
+    for name, base in baseline.items():
+        cur = summary.get(name)
+        if not cur or base["requests"] < 20 or cur["requests"] < 20:
+            continue  # too few samples for percentiles to mean anything
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * (1 + threshold / 100):
+            found.append(f"{name}: p95 {base['p95_ms']:.1f} -> {cur['p95_ms']:.1f} ms")
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - threshold / 100):
+            found.append(f"{name}: {base['rps']:.1f} -> {cur['rps']:.1f} req/s")
+    return found
+
+
+def main():
+    ap = argparse.ArgumentParser(description="load test with concurrent virtual users")
+    ap.add_argument("--api", help="base URL of a running server (default: in-process test client)")
+    ap.add_argument("--users", type=int, default=4, help="seeded users")
+    ap.add_argument("--projects", type=int, default=3, help="projects per user")
+    ap.add_argument("--tasks", type=int, default=200, help="tasks per project")
+    ap.add_argument("--subtasks", type=int, default=2, help="subtasks per task")
+    ap.add_argument("--vusers", type=int, default=8, help="concurrent virtual users")
+    ap.add_argument("--duration", type=float, default=10, help="seconds of measured load")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. list=70,create=10,update=15,delete=5")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--e2e", action="store_true", help="run the e2e scenario first and stop if it fails")
+    ap.add_argument("--save-baseline", metavar="PATH")
+    ap.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=20, help="allowed regression in percent")
+    args = ap.parse_args()
+
+    mix = parse_mix(args.mix)
+    if args.api:
+        import requests
+        base, session_factory = args.api, requests.Session
+    else:
+        app = inprocess_app()
+        base, session_factory = INPROCESS, lambda: AppSession(app)
+    print(f"Load test against {args.api or 'in-process app'}: {args.vusers} virtual users, "
+          f"{args.duration:g}s, mix {args.mix}")
+
+    if args.e2e:
+        tester = Tester(base, session_factory)
+        if tester.run() != 0:
+            return 1
+
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    accounts = seed(base, session_factory, Stats(), args.users, args.projects, args.tasks, args.subtasks, rng)
+    _ok(f"seeded {args.users} users x {args.projects} projects x {args.tasks} tasks x {args.subtasks} subtasks"
+        f" in {time.perf_counter() - t0:.1f}s")
+
+    elapsed, stats = run(base, session_factory, accounts, args.vusers, args.duration, mix, args.seed)
+    summary = stats.summary(elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(summary, elapsed, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "target": args.api or "inprocess",
+                "config": {k: getattr(args, k) for k in ("users", "projects", "tasks", "subtasks", "vusers", "duration", "mix", "seed")},
+                "elapsed": round(elapsed, 3),
+                "endpoints": summary,
+            }, f, indent=2)
+        _ok(f"baseline saved to {args.save_baseline}")
+
+    if baseline is not None:
+        found = regressions(summary, baseline, args.threshold)
+        if found:
+            _fail(f"{len(found)} regression(s) over {args.threshold:g}%:")
+            for line in found:
+                print(f"{YELLOW}  {line}{RESET}")
+            return 1
+        _ok(f"no regressions over {args.threshold:g}% against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# utils/authz.py
+# Ownership checks shared by the blueprints. Each lookup is one joined query that
+# both authorizes and loads the row, so handlers get back the object they are about
+# to work on (parents attached) instead of querying it again. Results, misses
+# included, are memoized on `g` for the rest of the request. A soft-deleted project
+# (being purged, utils/purge.py) is not found, and neither is anything under it.
+from flask import g, abort
+from flask_login import current_user
+from sqlalchemy.orm import contains_eager
+from models import Project, Task, Subtask
+
+
+def _memo():
+    if "authz" not in g:
+        g.authz = {}
+    return g.authz
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _lookup(kind, raw_id, load):
+    obj_id = _as_id(raw_id)
+    if not obj_id:
+        return None
+    memo = _memo()
+    key = (kind, obj_id)
+    if key not in memo:
+        memo[key] = load(obj_id)
+    return memo[key]
+
+
+def owned_project(project_id):
+    return _lookup("project", project_id, lambda pid: (
+        Project.query.filter_by(id=pid, owner_id=current_user.id, deleted_at=None).first()
+    ))
+
+
+def owned_task(task_id):
+    def load(tid):
+        t = (
+            Task.query.join(Task.project)
+            .options(contains_eager(Task.project))
+            .filter(Task.id == tid, Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+            .first()
+        )
+        if t:
+            _memo()[("project", t.project_id)] = t.project
+        return t
+    return _lookup("task", task_id, load)
+
+
+def owned_subtask(subtask_id):
+    def load(sid):
+        s = (
+            Subtask.query.join(Subtask.task).join(Task.project)
+            .options(contains_eager(Subtask.task).contains_eager(Task.project))
+            .filter(Subtask.id == sid, Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+            .first()
+        )
+        if s:
+            _memo()[("task", s.task_id)] = s.task
+            _memo()[("project", s.task.project_id)] = s.task.project
+        return s
+    return _lookup("subtask", subtask_id, load)
+
+
+def require_project(project_id) -> Project:
+    p = owned_project(project_id)
+    if not p:
+        abort(404)
+    return p
+
+
+def require_task(task_id) -> Task:
+    t = owned_task(task_id)
+    if not t:
+        abort(404)
+    return t
+
+
+def require_subtask(subtask_id) -> Subtask:
+    s = owned_subtask(subtask_id)
+    if not s:
+        abort(404)
+    return s
+
+
+# ---------- bulk variants: one query for any number of ids ----------
+
+def owned_project_ids(project_ids) -> set:
+    ids = {i for i in map(_as_id, project_ids) if i}
+    if not ids:
+        return set()
+    rows = (
+        Project.query.with_entities(Project.id)
+        .filter(Project.id.in_(ids), Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+    )
+    return {pid for (pid,) in rows}
+
+
+def owned_task_projects(task_ids) -> dict:
+    # {task_id: project_id} for the ids the current user owns
+    ids = {i for i in map(_as_id, task_ids) if i}
+    if not ids:
+        return {}
+    rows = (
+        Task.query.join(Task.project)
+        .with_entities(Task.id, Task.project_id)
+        .filter(Task.id.in_(ids), Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+    )
+    return {tid: pid for tid, pid in rows}
+
+
+def owned_tasks(task_ids) -> dict:
+    # {task_id: Task} for the ids the current user owns
+    ids = {i for i in map(_as_id, task_ids) if i}
+    if not ids:
+        return {}
+    rows = (
+        Task.query.join(Task.project)
+        .filter(Task.id.in_(ids), Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+    )
+    return {t.id: t for t in rows}
+
+
+def owned_subtasks(subtask_ids) -> dict:
+    # {subtask_id: Subtask} (with `.task` preloaded) for the ids the current user owns
+    ids = {i for i in map(_as_id, subtask_ids) if i}
+    if not ids:
+        return {}
+    rows = (
+        Subtask.query.join(Subtask.task).join(Task.project)
+        .options(contains_eager(Subtask.task))
+        .filter(Subtask.id.in_(ids), Project.owner_id == current_user.id, Project.deleted_at.is_(None))
+    )
+    return {s.id: s for s in rows}
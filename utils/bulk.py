@@ -0,0 +1,53 @@
+# utils/bulk.py
+# Request/response shape shared by the /bulk endpoints: the body is a JSON array
+# (or {"<key>": [...]}) and the reply carries one result per input item, in order.
+from sqlalchemy import insert
+from models import db
+
+MAX_BULK_ITEMS = 500
+
+
+def bulk_items(data, key="items"):
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, f"{key} must be a non-empty array"
+    if len(items) > MAX_BULK_ITEMS:
+        return None, f"at most {MAX_BULK_ITEMS} {key} per request"
+    return items, None
+
+
+def as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def item_ok(index: int, status: int, **extra):
+    return {"index": index, "status": status, **extra}
+
+
+def item_error(index: int, status: int, error: str):
+    return {"index": index, "status": status, "error": error}
+
+
+def insert_returning(model, rows):
+    # batched multi-row INSERT ... RETURNING, objects back in input order.
+    # SQLite can't pair batched RETURNING rows with parameters (SQLAlchemy would fall
+    # back to one INSERT per row), but it hands out rowids in VALUES order under its
+    # single writer lock, so sorting by id gives the same pairing.
+    if db.session.get_bind().dialect.name == "sqlite":
+        return sorted(db.session.scalars(insert(model).returning(model), rows).all(), key=lambda o: o.id)
+    return db.session.scalars(insert(model).returning(model, sort_by_parameter_order=True), rows).all()
+
+
+def insert_ids(model, rows):
+    # Core flavour of insert_returning() for high-volume paths: new ids only, in input order
+    table = model.__table__
+    if db.session.get_bind().dialect.name == "sqlite":
+        return sorted(db.session.scalars(insert(table).returning(table.c.id), rows).all())
+    return db.session.scalars(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).all()
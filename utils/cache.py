@@ -0,0 +1,184 @@
+# utils/cache.py
+# Server-side read cache for the list endpoints. Entries hold the serialized
+# payload (plain dicts/lists) and carry tags; writes invalidate by tag after they
+# commit (see utils/changes.py). The in-process LRU is the default backend; a
+# shared store can be plugged in with register_backend() + CACHE_BACKEND. The
+# routes put the version their ETag is built from into the key, so a copy that
+# missed an invalidation (another worker's write, or a read that raced one and
+# stored its old payload afterwards) is never served under the newer ETag; it
+# just goes unused until CACHE_TTL or the LRU drops it.
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from flask import request
+from flask_login import current_user
+
+
+class CacheBackend:
+    def __init__(self):
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, tags=()):
+        raise NotImplementedError
+
+    def invalidate(self, *tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "size": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class NullCache(CacheBackend):
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, tags=()):
+        pass
+
+    def invalidate(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_entries=1024, ttl=60.0, clock=time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = OrderedDict()     # key -> (expires_at, value, tags)
+        self._tags = defaultdict(set)  # tag -> keys
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (self._clock() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._data) > self.max_entries:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+BACKENDS = {
+    "lru": lambda config: LRUCache(config["CACHE_MAX_ENTRIES"], config["CACHE_TTL"]),
+    "none": lambda config: NullCache(),
+}
+
+
+def register_backend(name: str, factory):
+    # factory(app.config) -> CacheBackend
+    BACKENDS[name] = factory
+
+
+class ReadCache:
+    def __init__(self):
+        self.backend = NullCache()
+        self.hold = 0.0          # seconds after an invalidation during which a tag can't be re-cached
+        self._invalidated = {}   # tag -> monotonic time of its last invalidation
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "lru")
+        app.config.setdefault("CACHE_MAX_ENTRIES", 1024)
+        app.config.setdefault("CACHE_TTL", 60.0)
+        self.backend = BACKENDS[app.config["CACHE_BACKEND"]](app.config)
+        # with read replicas a lagging replica could re-cache rows a write just
+        # invalidated; hold those tags off for the lag tolerance (utils/replicas.py)
+        if app.config.get("DATABASE_REPLICA_URLS"):
+            self.hold = float(app.config.get("REPLICA_LAG_TOLERANCE", 5.0))
+        app.extensions["read_cache"] = self
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, tags=()):
+        if self.hold and self._held(tags):
+            return
+        self.backend.set(key, value, tags)
+
+    def invalidate(self, *tags):
+        if tags:
+            self.backend.invalidate(*tags)
+            if self.hold:
+                now = time.monotonic()
+                if len(self._invalidated) > 10000:
+                    self._invalidated = {t: at for t, at in self._invalidated.items() if now - at < self.hold}
+                self._invalidated.update((tag, now) for tag in tags)
+
+    def _held(self, tags) -> bool:
+        now = time.monotonic()
+        return any(now - self._invalidated.get(tag, -self.hold) < self.hold for tag in tags)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+cache = ReadCache()
+
+
+def request_key(scope: str, *ids) -> str:
+    # scope + owning user + ids + every query arg (filter, sort, page, cursor, ...)
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return ":".join([scope, f"u{current_user.id}", *(str(i) for i in ids)]) + "?" + args
@@ -0,0 +1,106 @@
+# utils/changes.py
+# Write-side bookkeeping. Every handler that changes data calls one of these
+# before its commit: version bumps land in the same transaction as the change,
+# read-cache invalidations and live events are queued on the session and only
+# go out once the transaction has committed (a rollback drops them).
+from sqlalchemy import event, insert, update
+from models import db, Project, User, Tombstone
+from utils.cache import cache
+from utils.events import events
+
+
+# ---------- read-cache tags ----------
+
+def project_list_tag(user_id) -> str:
+    return f"projects:u{user_id}"
+
+
+def task_list_tag(project_id) -> str:
+    return f"tasks:p{project_id}"
+
+
+def subtask_list_tag(task_id) -> str:
+    return f"subtasks:t{task_id}"
+
+
+def project_subtasks_tag(project_id) -> str:
+    return f"subtasks:p{project_id}"
+
+
+def invalidate(*tags):
+    db.session.info.setdefault("cache_tags", set()).update(tags)
+
+
+def emit(project_id, kind: str, items):
+    # live event for GET /projects/<id>/events, e.g. emit(3, "task.updated", [t.to_dict()])
+    db.session.info.setdefault("events", []).append((int(project_id), kind, {"project_id": int(project_id), "items": items}))
+
+
+def emit_by_project(kind: str, pairs):
+    # bulk writes: (project_id, item) pairs -> one event per project
+    grouped = {}
+    for project_id, item in pairs:
+        grouped.setdefault(project_id, []).append(item)
+    for project_id, items in grouped.items():
+        emit(project_id, kind, items)
+
+
+@event.listens_for(db.session, "after_commit")
+def _flush_invalidations(session):
+    cache.invalidate(*session.info.pop("cache_tags", ()))
+    for channel, kind, data in session.info.pop("events", ()):
+        events.publish(channel, kind, data)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_invalidations(session, previous_transaction):
+    session.info.pop("cache_tags", None)
+    session.info.pop("events", None)
+
+
+# ---------- change hooks ----------
+
+def project_changed(*project_ids):
+    # something under these projects was created/updated/deleted
+    ids = {int(pid) for pid in project_ids if pid}
+    if ids:
+        # updated_at is left alone: GET /sync sends the children, not the project
+        db.session.execute(
+            update(Project).where(Project.id.in_(ids))
+            .values(version=Project.version + 1, updated_at=Project.updated_at),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def project_list_changed(user_id: int):
+    # a project was added to or removed from this user's list
+    db.session.execute(
+        update(User).where(User.id == user_id).values(projects_version=User.projects_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+    invalidate(project_list_tag(user_id))
+
+
+def tasks_changed(*project_ids):
+    project_changed(*project_ids)
+    invalidate(*(task_list_tag(pid) for pid in project_ids))
+
+
+def subtasks_changed(*parents):
+    # parents: (task_id, project_id) of every touched subtask
+    project_changed(*{pid for _, pid in parents})
+    invalidate(*(subtask_list_tag(tid) for tid, _ in parents),
+               *(project_subtasks_tag(pid) for _, pid in parents))
+
+
+def deleted(kind: str, user_id: int, *ids):
+    # tombstones for GET /sync; `kind` is project, task or subtask
+    if ids:
+        db.session.execute(insert(Tombstone), [{"owner_id": user_id, "kind": kind, "ref_id": i} for i in ids])
+
+
+def project_deleted(user_id: int, project_id: int):
+    project_list_changed(user_id)
+    deleted("project", user_id, project_id)
+    emit(project_id, "project.deleted", [{"id": project_id}])
+    invalidate(task_list_tag(project_id), project_subtasks_tag(project_id))
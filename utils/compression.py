@@ -0,0 +1,77 @@
+# utils/compression.py
+# Response compression negotiated from Accept-Encoding, applied in an
+# after_request hook: brotli when the `brotli` package is installed and the
+# client takes it, else gzip. Bodies under COMPRESS_MIN_BYTES go out as they
+# are (the framing costs more than it saves), and so does anything streamed
+# (SSE, exports, which gzip themselves), already encoded, or not text-like.
+# ETags stay valid: the conditional ones are weak (utils/conditional.py), and
+# every compressible response carries Vary: Accept-Encoding for shared caches.
+import gzip
+from flask import request
+from utils.metrics import phase
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                "application/xml", "image/svg+xml")
+SKIP_STATUS = (204, 206, 304)
+
+ENCODINGS = {"gzip": lambda body, level: gzip.compress(body, compresslevel=level, mtime=0)}
+if brotli is not None:
+    ENCODINGS["br"] = lambda body, level: brotli.compress(body, quality=min(level, 11))
+
+
+def register_encoding(name: str, compress):
+    # compress(body: bytes, level: int) -> bytes; earlier entries win ties in Accept-Encoding
+    ENCODINGS[name] = compress
+
+
+class Compressor:
+    def __init__(self):
+        self.enabled = False
+        self.min_bytes = 1024
+        self.levels = {}
+        self.preference = ()
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS", True)
+        app.config.setdefault("COMPRESS_MIN_BYTES", 1024)
+        app.config.setdefault("COMPRESS_GZIP_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BR_QUALITY", 5)
+        self.enabled = bool(app.config["COMPRESS"])
+        self.min_bytes = int(app.config["COMPRESS_MIN_BYTES"])
+        self.levels = {"gzip": int(app.config["COMPRESS_GZIP_LEVEL"]),
+                       "br": int(app.config["COMPRESS_BR_QUALITY"])}
+        # brotli first: smaller output at a similar cost for JSON this size
+        self.preference = tuple(sorted(ENCODINGS, key=lambda name: name != "br"))
+        app.extensions["compression"] = self
+        if self.enabled:
+            app.after_request(self._compress)
+
+    def _compress(self, response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in SKIP_STATUS
+                or "Content-Encoding" in response.headers
+                or "no-transform" in response.headers.get("Cache-Control", "")
+                or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.preference)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+        with phase("compress"):
+            packed = ENCODINGS[encoding](body, self.levels.get(encoding, 6))
+        if len(packed) >= len(body):
+            return response
+        response.set_data(packed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+compressor = Compressor()
@@ -0,0 +1,28 @@
+# utils/conditional.py
+# ETag / If-None-Match for the list endpoints. Tags are built from the version
+# counters in utils/changes.py, so a matching request can be answered with 304
+# before the list query runs or anything is serialized.
+import hashlib
+from flask import request, make_response
+
+CACHE_CONTROL = "private, no-cache"  # browsers may keep a copy but must revalidate
+
+
+def etag_for(scope: str, version: int) -> str:
+    # query args are folded in so every page/filter of a list gets its own tag
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    digest = hashlib.blake2s(args.encode("utf-8"), digest_size=6).hexdigest()
+    return f"{scope}-v{version}-{digest}"
+
+
+def not_modified(etag: str):
+    if request.if_none_match.contains_weak(etag):
+        resp = make_response("", 304)
+        return tagged(resp, etag)
+    return None
+
+
+def tagged(resp, etag: str):
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = CACHE_CONTROL
+    return resp
@@ -0,0 +1,118 @@
+# utils/counters.py
+# Progress counters on Project/Task. Handlers describe what they changed on a
+# Tally and apply() it before committing: one `col = col + n` UPDATE per touched
+# row, so dashboards read counts in O(projects) instead of scanning tasks.
+# reconcile() recomputes everything with GROUP BY to repair drift.
+from collections import Counter, defaultdict
+from sqlalchemy import bindparam, func, update
+from models import db, Project, Task, Subtask, TASK_STATUSES, TASK_PRIORITIES
+
+PROJECT_COUNTERS = tuple(f"tasks_{v}" for v in TASK_STATUSES + TASK_PRIORITIES) + ("subtasks_total", "subtasks_done")
+TASK_COUNTERS = ("subtasks_total", "subtasks_done")
+
+
+class Tally:
+    def __init__(self):
+        self.projects = defaultdict(Counter)
+        self.tasks = defaultdict(Counter)
+
+    def task(self, project_id, status, priority, n=1):
+        c = self.projects[int(project_id)]
+        c[f"tasks_{status}"] += n
+        c[f"tasks_{priority}"] += n
+        return self
+
+    def subtask(self, task_id, project_id, status, n=1):
+        for c in (self.tasks[int(task_id)], self.projects[int(project_id)]):
+            c["subtasks_total"] += n
+            if status == "done":
+                c["subtasks_done"] += n
+        return self
+
+    def task_removed(self, task):
+        # a deleted task takes its status/priority and all of its subtasks with it
+        self.task(task.project_id, task.status, task.priority, -1)
+        c = self.projects[task.project_id]
+        c["subtasks_total"] -= task.subtasks_total
+        c["subtasks_done"] -= task.subtasks_done
+        return self
+
+    def apply(self):
+        # rows touching the same set of columns share one executemany UPDATE, so a
+        # batch of N subtasks under N tasks costs one round trip rather than N.
+        # Counters are bookkeeping, not edits: updated_at (GET /sync) is kept as is.
+        for model, deltas in ((Project, self.projects), (Task, self.tasks)):
+            table = model.__table__
+            groups = defaultdict(list)
+            for row_id, counts in deltas.items():
+                changed = {col: n for col, n in counts.items() if n}
+                if changed:
+                    groups[tuple(sorted(changed))].append({"_id": row_id, **{f"_{c}": n for c, n in changed.items()}})
+            for cols, params in groups.items():
+                stmt = (
+                    update(table).where(table.c.id == bindparam("_id"))
+                    .values({**{c: table.c[c] + bindparam(f"_{c}") for c in cols}, "updated_at": table.c.updated_at})
+                )
+                db.session.execute(stmt, params)
+        self.projects.clear()
+        self.tasks.clear()
+
+
+def reconcile(project_ids=None) -> int:
+    # recompute counters from the rows themselves; returns how many rows were off
+    task_q = db.session.query(Task.id)
+    project_q = db.session.query(Project.id)
+    if project_ids is not None:
+        task_q = task_q.filter(Task.project_id.in_(project_ids))
+        project_q = project_q.filter(Project.id.in_(project_ids))
+
+    task_counts = defaultdict(Counter)
+    project_counts = defaultdict(Counter)
+
+    def add_subtasks(counts, status, n):
+        counts["subtasks_total"] += n
+        if status == "done":
+            counts["subtasks_done"] += n
+
+    by_task = (
+        db.session.query(Subtask.task_id, Subtask.status, func.count())
+        .filter(Subtask.task_id.in_(task_q.scalar_subquery()))
+        .group_by(Subtask.task_id, Subtask.status)
+    )
+    for task_id, status, n in by_task:
+        add_subtasks(task_counts[task_id], status, n)
+
+    by_project = (
+        db.session.query(Task.project_id, Subtask.status, func.count())
+        .join(Subtask, Subtask.task_id == Task.id)
+        .filter(Task.project_id.in_(project_q.scalar_subquery()))
+        .group_by(Task.project_id, Subtask.status)
+    )
+    for project_id, status, n in by_project:
+        add_subtasks(project_counts[project_id], status, n)
+
+    for col in ("status", "priority"):
+        rows = (
+            db.session.query(Task.project_id, getattr(Task, col), func.count())
+            .filter(Task.project_id.in_(project_q.scalar_subquery()))
+            .group_by(Task.project_id, getattr(Task, col))
+        )
+        for project_id, value, n in rows:
+            project_counts[project_id][f"tasks_{value}"] += n
+
+    fixed = 0
+    for model, cols, expected, ids in ((Task, TASK_COUNTERS, task_counts, task_q),
+                                       (Project, PROJECT_COUNTERS, project_counts, project_q)):
+        stored = db.session.query(model.id, *(getattr(model, c) for c in cols)).filter(
+            model.id.in_(ids.scalar_subquery())
+        )
+        for row in stored:
+            want = {c: expected.get(row[0], {}).get(c, 0) for c in cols}
+            if any(row[i + 1] != want[c] for i, c in enumerate(cols)):
+                db.session.execute(
+                    update(model).where(model.id == row[0]).values(**want, updated_at=model.updated_at),
+                    execution_options={"synchronize_session": False},
+                )
+                fixed += 1
+    db.session.commit()
+    return fixed
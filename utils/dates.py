@@ -0,0 +1,20 @@
+# utils/dates.py
+# Due dates travel as ISO 'YYYY-MM-DD' strings in JSON and are stored as DATE.
+# Only that exact form is accepted (fromisoformat alone would also take
+# '20250101' or week dates), and it has to be a real calendar day.
+import re
+from datetime import date
+
+ISO_DAY = re.compile(r"\d{4}-\d{2}-\d{2}")
+DAY_ERROR = "due_date must be a YYYY-MM-DD date"
+
+
+def parse_day(value):
+    # None / '' -> None; anything else must be an ISO day or ValueError is raised
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not ISO_DAY.fullmatch(value.strip()):
+        raise ValueError(DAY_ERROR)
+    return date.fromisoformat(value.strip())
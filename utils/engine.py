@@ -0,0 +1,59 @@
+# utils/engine.py
+# Turns the DB_* / SQLITE_* settings of the active engine profile (config.py)
+# into SQLAlchemy engine options, and applies the SQLite pragmas to every new
+# DBAPI connection. Pragmas are per connection (journal_mode=wal also sticks
+# to the database file), so they go in a "connect" listener, not a one-off.
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+SQLITE_PRAGMAS = (
+    # config key, pragma; journal_mode first, it needs no open transaction
+    ("SQLITE_JOURNAL_MODE", "journal_mode"),
+    ("SQLITE_SYNCHRONOUS", "synchronous"),
+    ("SQLITE_BUSY_TIMEOUT", "busy_timeout"),
+    ("SQLITE_MMAP_SIZE", "mmap_size"),
+    ("SQLITE_CACHE_SIZE", "cache_size"),
+)
+# on in every profile: the ON DELETE CASCADE foreign keys remove tasks and
+# subtasks with their parent, and SQLite ignores foreign keys unless told
+SQLITE_ALWAYS = (("foreign_keys", "ON"),)
+
+
+def engine_options(config) -> dict:
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    opts = {}
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        # in-memory SQLite uses a single-connection pool that takes none of these
+        for key, opt in (("DB_POOL_SIZE", "pool_size"), ("DB_MAX_OVERFLOW", "max_overflow"),
+                         ("DB_POOL_TIMEOUT", "pool_timeout"), ("DB_POOL_RECYCLE", "pool_recycle")):
+            if config.get(key) is not None:
+                opts[opt] = config[key]
+    if config.get("DB_POOL_PRE_PING"):
+        opts["pool_pre_ping"] = True
+    if config.get("DB_STATEMENT_TIMEOUT") and url.get_backend_name() == "postgresql":
+        # server-side limit, set once per connection; SQLite has no equivalent
+        opts["connect_args"] = {"options": f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT'])}"}
+    return opts
+
+
+def sqlite_pragmas(config) -> list:
+    return [(pragma, config[key]) for key, pragma in SQLITE_PRAGMAS if config.get(key) is not None] + list(SQLITE_ALWAYS)
+
+
+def install_pragmas(engine, config):
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_conn, record):
+        cur = dbapi_conn.cursor()
+        for pragma, value in pragmas:
+            cur.execute(f"PRAGMA {pragma}={value}")
+        cur.close()
+
+
+def pragma_report(conn) -> dict:
+    # current values on a live connection, for the benchmark / debugging
+    pragmas = [pragma for _, pragma in SQLITE_PRAGMAS] + [pragma for pragma, _ in SQLITE_ALWAYS]
+    return {pragma: conn.exec_driver_sql(f"PRAGMA {pragma}").scalar() for pragma in pragmas}
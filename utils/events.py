@@ -0,0 +1,221 @@
+# utils/events.py
+# Live change feed behind GET /projects/<id>/events (Server-Sent Events). Write
+# handlers queue events with utils.changes.emit() and they are published here
+# once the transaction has committed, one channel per project.
+#
+# The default hub is in-process: each subscriber gets a bounded queue, and the
+# last EVENTS_HISTORY events of a channel are kept so a reconnecting client can
+# resume from Last-Event-ID. A subscriber whose queue fills up (slow consumer)
+# is cut loose: its stream drains what it already has and closes, and the
+# client's reconnect replays the rest from history, or gets a `reset` event
+# (refetch, e.g. via GET /sync) when the history no longer reaches back that far.
+# With several worker processes each one only sees its own writes; a shared
+# hub can be plugged in with register_hub() + EVENTS_BACKEND.
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from flask import Response
+
+
+class HubFull(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, channel, queue_size):
+        self.channel = channel
+        self.queue = queue.Queue(queue_size)
+        self.dropped = False
+
+
+class EventHub:
+    def __init__(self):
+        self.published = self.delivered = self.dropped = self.resets = 0
+
+    def publish(self, channel, kind: str, data):
+        raise NotImplementedError
+
+    def subscribe(self, channel, last_id=None):
+        # -> (Subscription, backlog of (id, kind, data) to replay, gap: bool)
+        raise NotImplementedError
+
+    def unsubscribe(self, sub: Subscription):
+        raise NotImplementedError
+
+    def subscribers(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "subscribers": self.subscribers(),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "resets": self.resets,
+        }
+
+
+class MemoryHub(EventHub):
+    def __init__(self, queue_size=256, history=512, max_subscribers=200, max_channels=1024):
+        super().__init__()
+        self.queue_size = queue_size
+        self.history = history
+        self.max_subscribers = max_subscribers
+        self.max_channels = max_channels
+        self.epoch = uuid.uuid4().hex[:8]  # ids from before a restart can't be resumed
+        self._lock = threading.Lock()
+        self._seq = {}                # channel -> last sequence number
+        self._history = OrderedDict()  # channel -> deque of (seq, event), LRU-bounded
+        self._subs = {}               # channel -> set of Subscription
+        self._count = 0
+
+    def publish(self, channel, kind, data):
+        with self._lock:
+            seq = self._seq.get(channel, 0) + 1
+            self._seq[channel] = seq
+            event = (f"{self.epoch}-{seq}", kind, json.dumps(data, separators=(",", ":")))
+            self._remember(channel, seq, event)
+            self.published += 1
+            for sub in list(self._subs.get(channel, ())):
+                try:
+                    sub.queue.put_nowait(event)
+                    self.delivered += 1
+                except queue.Full:
+                    sub.dropped = True
+                    self._discard(sub)
+                    self.dropped += 1
+
+    def subscribe(self, channel, last_id=None):
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise HubFull()
+            backlog, gap = self._since(channel, last_id)
+            if gap:
+                self.resets += 1
+            sub = Subscription(channel, self.queue_size)
+            self._subs.setdefault(channel, set()).add(sub)
+            self._count += 1
+            return sub, backlog, gap
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._discard(sub)
+
+    def subscribers(self) -> int:
+        return self._count
+
+    def _remember(self, channel, seq, event):
+        events = self._history.get(channel)
+        if events is None:
+            events = self._history[channel] = deque(maxlen=self.history)
+            while len(self._history) > self.max_channels:
+                self._history.popitem(last=False)
+        self._history.move_to_end(channel)
+        events.append((seq, event))
+
+    def _since(self, channel, last_id):
+        # events after `last_id` still in history; gap=True if some were lost
+        if not last_id:
+            return [], False
+        epoch, _, seq = last_id.partition("-")
+        latest = self._seq.get(channel, 0)
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > latest:
+            return [], True
+        seq = int(seq)
+        events = self._history.get(channel, ())
+        oldest = events[0][0] if events else latest + 1
+        if seq + 1 < oldest:
+            return [], True
+        return [e for s, e in events if s > seq], False
+
+    def _discard(self, sub):
+        subs = self._subs.get(sub.channel)
+        if subs is not None and sub in subs:
+            subs.discard(sub)
+            self._count -= 1
+            if not subs:
+                del self._subs[sub.channel]
+
+
+HUBS = {
+    "memory": lambda config: MemoryHub(
+        config["EVENTS_QUEUE_SIZE"], config["EVENTS_HISTORY"], config["EVENTS_MAX_SUBSCRIBERS"]
+    ),
+}
+
+
+def register_hub(name: str, factory):
+    # factory(app.config) -> EventHub
+    HUBS[name] = factory
+
+
+def frame(kind: str, data: str, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {kind}\ndata: {data}\n\n"
+
+
+class LiveEvents:
+    def __init__(self):
+        self.hub = MemoryHub()
+        self.heartbeat = 15.0
+        self.max_age = 300.0
+
+    def init_app(self, app):
+        app.config.setdefault("EVENTS_BACKEND", "memory")
+        app.config.setdefault("EVENTS_QUEUE_SIZE", 256)
+        app.config.setdefault("EVENTS_HISTORY", 512)
+        app.config.setdefault("EVENTS_MAX_SUBSCRIBERS", 200)
+        app.config.setdefault("EVENTS_HEARTBEAT", 15.0)
+        app.config.setdefault("EVENTS_MAX_AGE", 300.0)
+        self.hub = HUBS[app.config["EVENTS_BACKEND"]](app.config)
+        self.heartbeat = app.config["EVENTS_HEARTBEAT"]
+        self.max_age = app.config["EVENTS_MAX_AGE"]
+        app.extensions["live_events"] = self
+
+    def publish(self, channel, kind: str, data):
+        self.hub.publish(channel, kind, data)
+
+    def response(self, channel, last_id=None) -> Response:
+        # subscribes right away (HubFull propagates to the handler); the
+        # subscription is released when the server closes the response, even if
+        # the body was never iterated
+        sub, backlog, gap = self.hub.subscribe(channel, last_id)
+        resp = Response(self._frames(sub, backlog, gap), mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"  # don't let a proxy buffer the stream
+        resp.call_on_close(lambda: self.hub.unsubscribe(sub))
+        return resp
+
+    def _frames(self, sub, backlog, gap):
+        # every stream ends after max_age so idle worker threads get recycled;
+        # EventSource reconnects on its own and resumes from Last-Event-ID
+        deadline = time.monotonic() + self.max_age if self.max_age else None
+        try:
+            yield "retry: 2000\n: connected\n\n"
+            if gap:
+                yield frame("reset", json.dumps({"reason": "events missed, refetch"}))
+            for event_id, kind, data in backlog:
+                yield frame(kind, data, event_id)
+            while deadline is None or time.monotonic() < deadline:
+                if sub.dropped and sub.queue.empty():
+                    break  # slow consumer: close, the reconnect resumes from history
+                try:
+                    event_id, kind, data = sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield frame(kind, data, event_id)
+                if kind == "project.deleted":
+                    break
+        finally:
+            self.hub.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        return self.hub.stats()
+
+
+events = LiveEvents()
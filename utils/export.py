@@ -0,0 +1,99 @@
+# utils/export.py
+# Streaming project export. Rows are read as plain column tuples in
+# `yield_per` batches (a server-side cursor on Postgres), turned into records
+# one at a time and written out in ~64 KB chunks, optionally through a
+# streaming gzip compressor, so memory stays flat however big the project is.
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from sqlalchemy import select
+from models import Task, Subtask
+
+BATCH_ROWS = 500
+CHUNK_BYTES = 64 * 1024
+CSV_COLUMNS = ["type", "id", "parent_id", "title", "description", "status", "priority", "due_date", "created_at"]
+PARENT_KEY = {"task": "project_id", "subtask": "task_id"}
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def project_records(session, project):
+    # project first, then its tasks, then their subtasks; each record carries its
+    # parent id so the stream can be re-imported (POST /projects/import)
+    yield {"type": "project", **project.to_dict()}
+
+    tasks = (
+        select(Task.id, Task.project_id, Task.title, Task.status, Task.priority, Task.due_date, Task.created_at)
+        .where(Task.project_id == project.id)
+        .order_by(Task.rank, Task.id)  # manual order: the importer appends in file order
+    )
+    for r in session.execute(tasks, execution_options={"yield_per": BATCH_ROWS}):
+        yield {
+            "type": "task",
+            "id": r.id,
+            "project_id": r.project_id,
+            "title": r.title,
+            "status": r.status,
+            "priority": r.priority,
+            "due_date": _day(r.due_date),
+            "created_at": _day(r.created_at),
+        }
+
+    subtasks = (
+        select(Subtask.id, Subtask.task_id, Subtask.title, Subtask.status)
+        .join(Task, Task.id == Subtask.task_id)
+        .where(Task.project_id == project.id)
+        .order_by(Subtask.task_id, Subtask.rank, Subtask.id)
+    )
+    for r in session.execute(subtasks, execution_options={"yield_per": BATCH_ROWS}):
+        yield {"type": "subtask", "id": r.id, "task_id": r.task_id, "title": r.title, "status": r.status}
+
+
+def ndjson_lines(records):
+    for rec in records:
+        yield json.dumps(rec, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+def csv_lines(records):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for rec in records:
+        writer.writerow([
+            rec["type"], rec["id"], rec.get(PARENT_KEY.get(rec["type"]), ""),
+            rec.get("title", ""), rec.get("description", ""), rec.get("status", ""),
+            rec.get("priority", ""), rec.get("due_date") or "", rec.get("created_at", ""),
+        ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def chunked(lines, gzip=False):
+    # coalesce small lines into CHUNK_BYTES writes, gzip-compressing on the fly
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    pending, size = [], 0
+    for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            out = b"".join(pending)
+            pending, size = [], 0
+            out = compressor.compress(out) if compressor else out
+            if out:
+                yield out
+    out = b"".join(pending)
+    if compressor:
+        out = compressor.compress(out) + compressor.flush()
+    if out:
+        yield out
@@ -0,0 +1,86 @@
+# utils/fastjson.py
+# JSON provider behind jsonify(). JSON_ENCODER picks the encoder: "auto"
+# (orjson when it is installed, else the stdlib), "orjson" or "stdlib"; other
+# encoders can be added with register_encoder(). Responses keep the layout of
+# Flask's default provider: sorted keys, compact separators, a trailing newline,
+# and Flask's own handling of dates, Decimal, UUID and dataclasses. Whatever a
+# fast encoder can't do that way (non-str keys, huge ints, debug indenting)
+# falls back to the stdlib for that response.
+#
+# Non-ASCII text goes out as UTF-8 (ensure_ascii is off): that is what orjson
+# writes, so no payload is encoded twice. Setting app.json.ensure_ascii = True
+# brings back Flask's \uXXXX escapes, by re-encoding with the stdlib only the
+# responses that need it. Floats can also differ: orjson spells some
+# differently (1e-7 for the stdlib's 1e-07) and writes NaN/Infinity as null,
+# where the stdlib writes tokens JSON parsers reject. The values are the same.
+import json
+from flask.json.provider import DefaultJSONProvider
+from utils.metrics import phase
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+_default = DefaultJSONProvider.default  # Flask's handling of date, Decimal, UUID, ...
+
+
+def _stdlib(obj, ensure_ascii=False) -> bytes:
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(",", ":"),
+                      ensure_ascii=ensure_ascii).encode("utf-8")
+
+
+def _orjson(obj) -> bytes:
+    try:
+        return orjson.dumps(obj, default=_default, option=(
+            orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        ))
+    except (orjson.JSONEncodeError, TypeError):
+        return _stdlib(obj)
+
+
+ENCODERS = {"stdlib": _stdlib}
+if orjson is not None:
+    ENCODERS["orjson"] = _orjson
+
+
+def register_encoder(name: str, encode):
+    # encode(obj) -> UTF-8 bytes, the same JSON as _stdlib()
+    ENCODERS[name] = encode
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    encode = staticmethod(_stdlib)
+    ensure_ascii = False
+
+    def _compact(self, obj) -> bytes:
+        body = self.encode(obj)
+        if self.ensure_ascii and not body.isascii():
+            body = _stdlib(obj, ensure_ascii=True)
+        return body
+
+    def dumps(self, obj, **kwargs):
+        # app.json.dumps(): Flask's output unless compact separators are asked for
+        with phase("serialize"):
+            if kwargs == {"separators": (",", ":")}:
+                return self._compact(obj).decode("utf-8")
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)  # indented: the stdlib path
+        obj = self._prepare_response_obj(args, kwargs)
+        with phase("serialize"):
+            body = self._compact(obj)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.config.setdefault("JSON_ENCODER", "auto")
+    name = app.config["JSON_ENCODER"]
+    if name == "auto":
+        name = "orjson" if "orjson" in ENCODERS else "stdlib"
+    provider = FastJSONProvider(app)
+    provider.encode = ENCODERS[name]
+    app.json = provider
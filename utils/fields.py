@@ -0,0 +1,55 @@
+# utils/fields.py
+# Sparse fieldsets: `?fields=id,title,status` on the list and detail endpoints.
+# The projection goes into the SELECT column list (or load_only() where the
+# handler needs ORM objects), so unrequested columns are never read, rather
+# than dropped from the dict after serialization. Selectable fields are the
+# model's LIST_COLUMNS, i.e. the keys of its to_dict(); anything else is a 400.
+from sqlalchemy.orm import load_only
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Projection:
+    def __init__(self, model, keys):
+        self.model = model
+        self.keys = keys
+        by_key = {c.key: c for c in model.LIST_COLUMNS}
+        self.columns = [by_key[k] for k in keys]
+        formats = getattr(model, "FIELD_FORMATS", {})
+        self._fields = [(k, formats.get(k)) for k in keys]
+
+    def select(self, *extra):
+        # columns to SELECT: the fields plus whatever the query itself reads back
+        # from the rows (keyset sort keys); the extras are not serialized
+        return self.columns + [c for c in extra if c.key not in self.keys]
+
+    def load_only(self, *extra):
+        return load_only(*(getattr(self.model, c.key) for c in self.select(*extra)))
+
+    def row_dict(self, row):
+        # row: a Row from select(*self.select()) or a load_only() object
+        out = {}
+        for key, fmt in self._fields:
+            value = getattr(row, key)
+            out[key] = fmt(value) if fmt else value
+        return out
+
+
+def requested(model, args):
+    # -> Projection, or None when `fields` is absent/empty (the full to_dict() shape)
+    raw = (args.get("fields") or "").strip()
+    if not raw:
+        return None
+    allowed = [c.key for c in model.LIST_COLUMNS]
+    keys = []
+    for name in (f.strip() for f in raw.split(",")):
+        if not name or name in keys:
+            continue
+        if name not in allowed:
+            raise InvalidFields(f"unknown field {name!r}; one of: {', '.join(allowed)}")
+        keys.append(name)
+    if not keys:
+        return None
+    return Projection(model, [k for k in allowed if k in keys])
@@ -0,0 +1,82 @@
+# utils/hashing.py
+# Password hashing off the request thread. bcrypt is deliberately slow, so a
+# burst of logins/signups could otherwise occupy every worker. Hashes run on a
+# small thread pool with a bounded backlog; when the backlog is full the caller
+# gets HashingBusy straight away (the app turns it into a 503) instead of
+# queueing behind everybody else.
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt as _bcrypt
+from utils.metrics import phase
+
+
+# bcrypt only reads this many bytes, and bcrypt 5 raises ValueError past it
+# rather than truncating; auth.py answers 400 before hashing anything longer
+MAX_PASSWORD_BYTES = 72
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def password_too_long(raw: str) -> bool:
+    return len(raw.encode("utf-8")) > MAX_PASSWORD_BYTES
+
+
+def hash_cost(hashed: str) -> int:
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=2, queue_limit=16, timeout=10.0):
+        self.configure(rounds, workers, queue_limit, timeout)
+
+    def init_app(self, app):
+        app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+        app.config.setdefault("HASH_WORKERS", 2)
+        app.config.setdefault("HASH_QUEUE_LIMIT", 16)
+        app.config.setdefault("HASH_TIMEOUT", 10.0)
+        self.configure(app.config["BCRYPT_LOG_ROUNDS"], app.config["HASH_WORKERS"],
+                       app.config["HASH_QUEUE_LIMIT"], app.config["HASH_TIMEOUT"])
+        app.extensions["password_hasher"] = self
+
+    def configure(self, rounds, workers, queue_limit, timeout):
+        if getattr(self, "_pool", None) is not None:
+            self._pool.shutdown(wait=False)
+        self.rounds = rounds
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # running + waiting jobs; anything past this is rejected, not queued
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            with phase("bcrypt"):
+                return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy() from None
+
+    def hash(self, raw: str) -> str:
+        salt = _bcrypt.gensalt(self.rounds)
+        return self._run(_bcrypt.hashpw, raw.encode("utf-8"), salt).decode("utf-8")
+
+    def check(self, hashed: str, raw: str) -> bool:
+        return self._run(_bcrypt.checkpw, raw.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_cost(hashed) != self.rounds
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,59 @@
+# utils/identity.py
+# Cache behind flask_login's user_loader. Instead of a SELECT on users for every
+# authenticated request, the loader hands back a small immutable Identity with
+# just the fields handlers use (to_dict, ownership checks). Counters such as
+# projects_version stay out of it: other processes bump them without evicting
+# this process's entries, so they are read from the row. Entries are evicted
+# after any commit that changes the user's row (see models.py);
+# IDENTITY_CACHE=0 restores the plain query.
+from dataclasses import dataclass
+from flask_login import UserMixin
+from utils.cache import LRUCache
+
+
+@dataclass(frozen=True)
+class Identity(UserMixin):
+    id: int
+    username: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email)
+
+    def to_dict(self):
+        return {"id": self.id, "username": self.username, "email": self.email}
+
+
+def _tag(user_id) -> str:
+    return f"user:{user_id}"
+
+
+class IdentityCache:
+    def __init__(self):
+        self.enabled = False
+        self._store = LRUCache(0, 0)
+
+    def init_app(self, app):
+        app.config.setdefault("IDENTITY_CACHE", True)
+        app.config.setdefault("IDENTITY_CACHE_SIZE", 4096)
+        app.config.setdefault("IDENTITY_CACHE_TTL", 300.0)
+        self.enabled = bool(app.config["IDENTITY_CACHE"])
+        self._store = LRUCache(app.config["IDENTITY_CACHE_SIZE"], app.config["IDENTITY_CACHE_TTL"])
+        app.extensions["identity_cache"] = self
+
+    def get(self, user_id: int):
+        return self._store.get(user_id)
+
+    def put(self, identity: Identity) -> Identity:
+        self._store.set(identity.id, identity, tags=[_tag(identity.id)])
+        return identity
+
+    def evict(self, *user_ids):
+        self._store.invalidate(*(_tag(uid) for uid in user_ids))
+
+    def stats(self) -> dict:
+        return self._store.stats()
+
+
+identities = IdentityCache()
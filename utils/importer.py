@@ -0,0 +1,262 @@
+# utils/importer.py
+# Streaming project import (POST /projects/import). The body is read line by
+# line straight off the request stream (optionally gunzipped on the fly), so
+# memory is bounded by the batch size, not the upload. Tasks and subtasks are
+# buffered and written with Core executemany INSERTs; source ids from the
+# export are mapped to the new rows as each batch lands, so subtasks can point
+# at tasks from earlier in the same stream.
+#
+# mode=atomic (default): one transaction, the first bad record aborts everything.
+# mode=partial: every batch commits on its own, bad records are skipped and reported.
+#
+# GET /sync reads updated_at, which is normally the time a row was written. An
+# atomic import can run for longer than sync's settle window, so every row it
+# wrote is stamped again just before the commit that makes it visible.
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import datetime
+from sqlalchemy import update
+from models import db, Project, Task, Subtask, TASK_STATUSES, TASK_PRIORITIES, SUBTASK_STATUSES
+from utils.bulk import insert_ids, as_id, text
+from utils.changes import project_list_changed, tasks_changed, invalidate, project_subtasks_tag, emit
+from utils.counters import Tally
+from utils.dates import parse_day, DAY_ERROR
+from utils.ranks import Appender
+
+MAX_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+PARENT_KEY = {"task": "project_id", "subtask": "task_id"}
+
+
+class ImportFailed(Exception):
+    def __init__(self, line: int, error: str):
+        super().__init__(error)
+        self.line = line
+        self.error = error
+
+
+def open_body(stream, content_encoding: str = ""):
+    # binary request stream -> text lines, gunzipping as we go
+    raw = io.BufferedReader(stream) if isinstance(stream, io.RawIOBase) else stream
+    if "gzip" in (content_encoding or "").lower():
+        raw = gzip.GzipFile(fileobj=raw, mode="rb")
+    return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+
+def ndjson_records(lines):
+    # yields (line number, record, error); a bad line doesn't end the stream
+    for n, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            yield n, None, "invalid JSON"
+            continue
+        if not isinstance(rec, dict):
+            yield n, None, "record must be an object"
+            continue
+        yield n, rec, None
+
+
+def csv_records(lines):
+    # export CSV layout: parent_id is the project for tasks and the task for subtasks
+    reader = csv.DictReader(lines)
+    for rec in reader:
+        rec = {k: (v if v != "" else None) for k, v in rec.items() if k}
+        parent = rec.pop("parent_id", None)
+        if rec.get("type") in PARENT_KEY:
+            rec[PARENT_KEY[rec["type"]]] = parent
+        yield reader.line_num, rec, None
+
+
+class Importer:
+    def __init__(self, owner_id: int, into=None, batch_size=500, atomic=True):
+        self.owner_id = owner_id
+        self.into = into
+        self.batch_size = batch_size
+        self.atomic = atomic
+        self.projects = {}        # source project id -> new id
+        self.tasks = {}           # source task id -> (new id, project id)
+        self.pending_tasks = []   # (line, source id, row)
+        self.pending_ids = set()
+        self.pending_subtasks = []  # (line, project id, row)
+        self.tally = Tally()
+        self.task_ranks = Appender(Task)  # rows keep their file order
+        self.subtask_ranks = Appender(Subtask)
+        self.touched = set()      # projects written since the last commit
+        self.written = {Project: [], Task: [], Subtask: []}  # new ids since the last commit
+        self.new_projects = False
+        self.counts = {"projects": 0, "tasks": 0, "subtasks": 0}
+        self.rows = 0
+        self.skipped = 0
+        self.errors = []
+
+    # ---------- records ----------
+
+    def run(self, records) -> dict:
+        start = time.perf_counter()
+        for line, rec, error in records:
+            self.rows += 1
+            try:
+                if error:
+                    raise ImportFailed(line, error)
+                self.add(line, rec)
+            except ImportFailed as e:
+                if self.atomic:
+                    raise
+                self.skipped += 1
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append({"line": e.line, "error": e.error})
+        self.flush_tasks()
+        self.flush_subtasks()
+        self.commit()
+        elapsed = time.perf_counter() - start
+        return {
+            "mode": "atomic" if self.atomic else "partial",
+            "created": self.counts,
+            "project_ids": sorted(self.projects.values()) if self.into is None else [self.into],
+            "rows": self.rows,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(self.rows / elapsed, 1) if elapsed else None,
+        }
+
+    def add(self, line: int, rec: dict):
+        kind = rec.get("type")
+        if kind == "project":
+            self.add_project(line, rec)
+        elif kind == "task":
+            self.add_task(line, rec)
+        elif kind == "subtask":
+            self.add_subtask(line, rec)
+        else:
+            raise ImportFailed(line, "type must be project, task or subtask")
+
+    def add_project(self, line: int, rec: dict):
+        if self.into is not None:
+            return  # importing into an existing project: its own header is ignored
+        title = text(rec.get("title"))
+        if not title:
+            raise ImportFailed(line, "title is required")
+        p = Project(owner_id=self.owner_id, title=title, description=text(rec.get("description")))
+        db.session.add(p)
+        db.session.flush()
+        self.written[Project].append(p.id)
+        self.task_ranks.empty(p.id)
+        self.projects[as_id(rec.get("id")) or -line] = p.id
+        self.new_projects = True
+        self.counts["projects"] += 1
+
+    def add_task(self, line: int, rec: dict):
+        if self.into is not None:
+            project_id = self.into
+        else:
+            project_id = self.projects.get(as_id(rec.get("project_id")))
+            if project_id is None:
+                raise ImportFailed(line, "project_id does not match an imported project")
+        title = text(rec.get("title"))
+        status = rec.get("status") or "todo"
+        priority = rec.get("priority") or "normal"
+        if not title:
+            raise ImportFailed(line, "title is required")
+        if status not in TASK_STATUSES:
+            raise ImportFailed(line, "invalid status")
+        if priority not in TASK_PRIORITIES:
+            raise ImportFailed(line, "invalid priority")
+        try:
+            due_date = parse_day(rec.get("due_date"))
+        except ValueError:
+            raise ImportFailed(line, DAY_ERROR)
+        source_id = as_id(rec.get("id"))
+        row = {"project_id": project_id, "owner_id": self.owner_id, "title": title,
+               "status": status, "priority": priority, "due_date": due_date,
+               "rank": self.task_ranks.next(project_id)}
+        self.pending_tasks.append((line, source_id, row))
+        if source_id is not None:
+            self.pending_ids.add(source_id)
+        if len(self.pending_tasks) >= self.batch_size:
+            self.flush_tasks()
+            self.batch_done()
+
+    def add_subtask(self, line: int, rec: dict):
+        source_task = as_id(rec.get("task_id"))
+        if source_task in self.pending_ids:
+            self.flush_tasks()  # parent is still buffered: write it first to get its id
+        parent = self.tasks.get(source_task)
+        if parent is None:
+            raise ImportFailed(line, "task_id does not match an imported task")
+        title = text(rec.get("title"))
+        status = rec.get("status") or "todo"
+        if not title:
+            raise ImportFailed(line, "title is required")
+        if status not in SUBTASK_STATUSES:
+            raise ImportFailed(line, "invalid status")
+        task_id, project_id = parent
+        row = {"task_id": task_id, "owner_id": self.owner_id, "title": title, "status": status,
+               "rank": self.subtask_ranks.next(task_id)}
+        self.pending_subtasks.append((line, project_id, row))
+        if len(self.pending_subtasks) >= self.batch_size:
+            self.flush_subtasks()
+            self.batch_done()
+
+    # ---------- batches ----------
+
+    def flush_tasks(self):
+        if not self.pending_tasks:
+            return
+        ids = insert_ids(Task, [row for _, _, row in self.pending_tasks])
+        self.written[Task] += ids
+        for (_, source_id, row), new_id in zip(self.pending_tasks, ids):
+            self.subtask_ranks.empty(new_id)
+            if source_id is not None:
+                self.tasks[source_id] = (new_id, row["project_id"])
+            self.tally.task(row["project_id"], row["status"], row["priority"])
+            self.touched.add(row["project_id"])
+        self.counts["tasks"] += len(ids)
+        self.pending_tasks.clear()
+        self.pending_ids.clear()
+
+    def flush_subtasks(self):
+        if not self.pending_subtasks:
+            return
+        self.written[Subtask] += insert_ids(Subtask, [row for _, _, row in self.pending_subtasks])
+        for _, project_id, row in self.pending_subtasks:
+            self.tally.subtask(row["task_id"], project_id, row["status"])
+            self.touched.add(project_id)
+        self.counts["subtasks"] += len(self.pending_subtasks)
+        self.pending_subtasks.clear()
+
+    def batch_done(self):
+        if not self.atomic:
+            self.commit()
+
+    def commit(self):
+        self.tally.apply()
+        if self.touched:
+            tasks_changed(*self.touched)
+            invalidate(*(project_subtasks_tag(pid) for pid in self.touched))
+            for pid in self.touched:
+                emit(pid, "project.imported", [])  # too many rows to push: clients refetch
+        if self.new_projects:
+            project_list_changed(self.owner_id)
+        self.restamp()
+        db.session.commit()
+        self.touched.clear()
+        self.new_projects = False
+
+    def restamp(self):
+        # updated_at = now for everything this transaction wrote, so a /sync cursor
+        # handed out while it ran can't already be past the first batches
+        now = datetime.utcnow()
+        for model, ids in self.written.items():
+            table = model.__table__
+            for i in range(0, len(ids), MAX_BATCH_SIZE):
+                db.session.execute(
+                    update(table).where(table.c.id.in_(ids[i:i + MAX_BATCH_SIZE])).values(updated_at=now)
+                )
+            ids.clear()
@@ -0,0 +1,217 @@
+# utils/metrics.py
+# Per-request performance numbers. SQLAlchemy cursor events count and time
+# every statement; handlers and helpers time named phases (auth, bcrypt,
+# serialize, which includes the JSON encoding in utils/fastjson.py) with
+# phase()/timed(). Each response carries them in a
+# Server-Timing header (visible in the browser's network panel), and
+# GET /metrics (only registered with METRICS_ENDPOINT=1: it is unauthenticated,
+# for a scraper on a private network) exposes running totals and latency
+# histograms per route in the Prometheus text format. SLOW_QUERY_MS > 0 logs slower statements with a
+# fingerprint (literals stripped) so repeats of one query group together.
+import hashlib
+import logging
+import re
+import threading
+import time
+from functools import wraps
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+slow_log = logging.getLogger("app.slow_query")
+
+
+class RequestPerf:
+    __slots__ = ("start", "queries", "db", "phases", "open")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+        self.open = set()
+
+
+def _current():
+    return g.get("perf") if has_app_context() else None
+
+
+class phase:
+    # with phase("bcrypt"): ...  nested uses of the same phase count once
+    __slots__ = ("name", "perf", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.perf = _current()
+        if self.perf is not None and self.name not in self.perf.open:
+            self.perf.open.add(self.name)
+            self.start = time.perf_counter()
+        else:
+            self.perf = None
+        return self
+
+    def __exit__(self, *exc):
+        if self.perf is not None:
+            self.perf.open.discard(self.name)
+            self.perf.phases[self.name] = self.perf.phases.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def timed(name: str):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                      # string literals
+    (re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+"), "?"),              # driver/bind placeholders
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                    # numbers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),        # IN lists of any length
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(statement: str):
+    # -> (short hash, normalized statement)
+    sql = statement
+    for pattern, repl in _LITERALS:
+        sql = pattern.sub(repl, sql)
+    sql = sql.strip()
+    return hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12], sql
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = 0.0
+        self._lock = threading.Lock()
+        self.latency = {}      # (route, method, status) -> Histogram
+        self.db_queries = {}   # route -> statements
+        self.db_seconds = {}   # route -> seconds
+        self.phase_seconds = {}  # (route, phase) -> seconds
+        self.slow_queries = 0
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS", True)
+        app.config.setdefault("METRICS_ENDPOINT", False)
+        app.config.setdefault("SLOW_QUERY_MS", 0.0)
+        self.enabled = bool(app.config["METRICS"])
+        self.slow_ms = float(app.config["SLOW_QUERY_MS"])
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def instrument(self, engine):
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._metrics_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            start = getattr(context, "_metrics_start", None)
+            if start is None:
+                return
+            elapsed = time.perf_counter() - start
+            perf = _current()
+            if perf is not None:
+                perf.queries += 1
+                perf.db += elapsed
+            if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+                self._slow(statement, elapsed, executemany)
+
+    def _slow(self, statement, elapsed, executemany):
+        fp, sql = fingerprint(statement)
+        with self._lock:
+            self.slow_queries += 1
+        route = request.url_rule.rule if has_request_context() and request.url_rule else "-"
+        slow_log.warning("slow query %.1fms fp=%s route=%s%s: %s", elapsed * 1000, fp, route,
+                         " (executemany)" if executemany else "", sql[:1000])
+
+    def _start(self):
+        g.perf = RequestPerf()
+
+    def _finish(self, response):
+        perf = g.pop("perf", None)
+        if perf is None:
+            return response
+        elapsed = time.perf_counter() - perf.start
+        timing = [f'db;dur={perf.db * 1000:.1f};desc="{perf.queries} queries"']
+        timing += [f"{name};dur={secs * 1000:.1f}" for name, secs in perf.phases.items()]
+        timing.append(f"app;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timing)
+
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        with self._lock:
+            key = (route, request.method, response.status_code)
+            hist = self.latency.get(key)
+            if hist is None:
+                hist = self.latency[key] = Histogram()
+            hist.observe(elapsed)
+            self.db_queries[route] = self.db_queries.get(route, 0) + perf.queries
+            self.db_seconds[route] = self.db_seconds.get(route, 0.0) + perf.db
+            for name, secs in perf.phases.items():
+                self.phase_seconds[(route, name)] = self.phase_seconds.get((route, name), 0.0) + secs
+        return response
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4
+        out = [
+            "# HELP http_request_duration_seconds Time from routing to response, per route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (route, method, status), hist in sorted(self.latency.items()):
+                labels = _labels(route=route, method=method, status=status)
+                for bound, count in zip(BUCKETS, hist.counts):
+                    out.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                out.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.total}')
+                out.append(f"http_request_duration_seconds_sum{{{labels}}} {hist.sum:.6f}")
+                out.append(f"http_request_duration_seconds_count{{{labels}}} {hist.total}")
+            out += ["# HELP db_queries_total SQL statements executed, per route.", "# TYPE db_queries_total counter"]
+            out += [f"db_queries_total{{{_labels(route=r)}}} {n}" for r, n in sorted(self.db_queries.items())]
+            out += ["# HELP db_seconds_total Time spent executing SQL, per route.", "# TYPE db_seconds_total counter"]
+            out += [f"db_seconds_total{{{_labels(route=r)}}} {s:.6f}" for r, s in sorted(self.db_seconds.items())]
+            out += ["# HELP phase_seconds_total Time spent per phase (auth, bcrypt, serialize), per route.",
+                    "# TYPE phase_seconds_total counter"]
+            out += [f"phase_seconds_total{{{_labels(route=r, phase=p)}}} {s:.6f}"
+                    for (r, p), s in sorted(self.phase_seconds.items())]
+            out += ["# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS.",
+                    "# TYPE db_slow_queries_total counter", f"db_slow_queries_total {self.slow_queries}"]
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
@@ -1,14 +1,153 @@
 # utils/pagination.py
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_
+from utils.metrics import phase
+
+
 def paginate(query, page=1, per_page=10, serializer=lambda x: x):
     total = query.count()
     items = query.limit(per_page).offset((page - 1) * per_page).all()
     pages = (total + per_page - 1) // per_page if per_page else 1
+    with phase("serialize"):
+        data = [serializer(i) for i in items]
     return {
-        "data": [serializer(i) for i in items],
+        "data": data,
         "meta": {
             "page": page,
             "pages": pages,
             "total": total,
             "per_page": per_page,
         },
-    }
\ No newline at end of file
+    }
+
+
+# ---------- keyset (cursor) pagination ----------
+# Pages are addressed by the sort key of the last row seen instead of an
+# OFFSET, so page N costs the same as page 1 and no COUNT(*) is needed.
+# `columns` is the full ORDER BY and must end in a unique column (normally the
+# primary key) so every row has a distinct position. Plain columns sort
+# ascending with NULLs first; wrap one in Sort() for DESC and/or NULLS LAST.
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Sort:
+    def __init__(self, column, descending=False, nulls_last=False):
+        self.column = column
+        self.descending = descending
+        self.nulls_last = nulls_last
+
+    @property
+    def key(self):
+        return self.column.key
+
+
+def _sort(term) -> Sort:
+    return term if isinstance(term, Sort) else Sort(term)
+
+
+def _python_type(col):
+    col = _sort(col).column
+    try:
+        return col.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _dump(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _load(value, col):
+    if value is None:
+        return None
+    kind = _python_type(col)
+    if kind is datetime:
+        return datetime.fromisoformat(value)
+    if kind is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def _nullable(col):
+    col = _sort(col).column
+    return bool(getattr(getattr(col, "expression", col), "nullable", False))
+
+
+def encode_cursor(columns, values) -> str:
+    payload = {"k": [c.key for c in columns], "v": [_dump(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(columns, cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["k"] != [c.key for c in columns] or len(payload["v"]) != len(columns):
+            raise InvalidCursor("cursor does not match sort")
+        return [_load(v, c) for v, c in zip(payload["v"], columns)]
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor("malformed cursor") from e
+
+
+def order_clause(columns):
+    # NULL placement is always spelled out (SQLite's native ascending order puts
+    # them first, Postgres' last) so the predicate in `after()` means the same
+    # thing on every backend.
+    clauses = []
+    for term in map(_sort, columns):
+        c = term.column.desc() if term.descending else term.column.asc()
+        if _nullable(term):
+            c = c.nulls_last() if term.nulls_last else c.nulls_first()
+        clauses.append(c)
+    return clauses
+
+
+def after(columns, values):
+    """WHERE clause selecting rows strictly after `values` in `order_clause` order."""
+    term, value = _sort(columns[0]), values[0]
+    col = term.column
+    last = len(columns) == 1
+    rest = None if last else after(columns[1:], values[1:])
+    if value is None:
+        # inside the NULL group: only NULLs-first has non-NULL rows still to come
+        if term.nulls_last:
+            return col.is_(None) if last else and_(col.is_(None), rest)
+        return col.isnot(None) if last else or_(col.isnot(None), and_(col.is_(None), rest))
+    beyond = [col < value if term.descending else col > value]
+    if term.nulls_last and _nullable(term):
+        beyond.append(col.is_(None))
+    if not last:
+        beyond.append(and_(col == value, rest))
+    return or_(*beyond) if len(beyond) > 1 else beyond[0]
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=10, with_total=False,
+                    serializer=lambda x: x):
+    total = query.order_by(None).count() if with_total else None
+
+    q = query
+    if cursor:
+        q = q.filter(after(columns, decode_cursor(columns, cursor)))
+    rows = q.order_by(*order_clause(columns)).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(columns, [getattr(last, c.key) for c in columns])
+
+    meta = {"per_page": per_page, "next_cursor": next_cursor}
+    if total is not None:
+        meta["total"] = total
+    with phase("serialize"):
+        data = [serializer(r) for r in rows]
+    return {"data": data, "meta": meta}
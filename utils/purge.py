@@ -0,0 +1,93 @@
+# utils/purge.py
+# Project deletes. Tasks and subtasks go with ON DELETE CASCADE, so the usual
+# path is a single DELETE and nothing is loaded into the session. A project of
+# PURGE_BACKGROUND_TASKS tasks or more (or DELETE ...?background=1) is
+# soft-deleted instead: deleted_at is set, the request returns 202, and every
+# read path treats the project as gone (authz, the lists, and the owner-wide
+# views through models.purging_projects). A worker thread then deletes its
+# tasks PURGE_CHUNK_SIZE at a time, committing between chunks so no single
+# transaction holds the write lock for long, and finally the project row.
+# `flask purge-projects` finishes purges that a restart cut short.
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import delete, event, select
+from models import db, Project, Task
+
+log = logging.getLogger("app.purge")
+
+
+class Purger:
+    def __init__(self):
+        self.app = None
+        self.chunk = 500
+        self.threshold = 5000
+        self._pool = None
+
+    def init_app(self, app):
+        app.config.setdefault("PURGE_CHUNK_SIZE", 500)
+        app.config.setdefault("PURGE_BACKGROUND_TASKS", 5000)
+        self.app = app
+        self.chunk = max(1, int(app.config["PURGE_CHUNK_SIZE"]))
+        self.threshold = int(app.config["PURGE_BACKGROUND_TASKS"])
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="purge")
+        app.extensions["purge"] = self
+
+    def too_big(self, project) -> bool:
+        # from the maintained counters, no COUNT(*)
+        size = project.tasks_todo + project.tasks_in_progress + project.tasks_done
+        return 0 < self.threshold <= size
+
+    def soft_delete(self, project):
+        # the purge is queued on the session and starts once the caller commits
+        project.deleted_at = datetime.utcnow()
+        db.session.info.setdefault("purge", []).append(project.id)
+
+    def submit(self, project_id: int):
+        self._pool.submit(self._run, project_id)
+
+    def _run(self, project_id: int):
+        with self.app.app_context():
+            try:
+                n = self.purge(project_id)
+            except Exception:
+                db.session.rollback()
+                log.exception("purge of project %s failed; `flask purge-projects` retries it", project_id)
+            else:
+                log.info("purged project %s (%d tasks)", project_id, n)
+
+    def purge(self, project_id: int) -> int:
+        # -> tasks deleted; the caller owns no transaction, each chunk commits
+        total = 0
+        while True:
+            chunk = select(Task.id).where(Task.project_id == project_id).limit(self.chunk).scalar_subquery()
+            n = db.session.execute(
+                delete(Task).where(Task.id.in_(chunk)), execution_options={"synchronize_session": False}
+            ).rowcount
+            db.session.commit()
+            total += n
+            if n < self.chunk:
+                break
+        db.session.execute(
+            delete(Project).where(Project.id == project_id, Project.deleted_at.isnot(None)),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+        return total
+
+    def pending(self) -> list:
+        return list(db.session.scalars(select(Project.id).where(Project.deleted_at.isnot(None))))
+
+
+@event.listens_for(db.session, "after_commit")
+def _start_purges(session):
+    for project_id in session.info.pop("purge", ()):
+        purger.submit(project_id)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_purges(session, previous_transaction):
+    session.info.pop("purge", None)
+
+
+purger = Purger()
@@ -0,0 +1,239 @@
+# utils/ranks.py
+# Manual order for tasks (within a project) and subtasks (within a task).
+# Each row has a `rank`: a base-36 fraction written as its digits after the
+# point, with no trailing zeros ("i" = 0.5, "i8" = 0.5 + 8/36^2). Plain string
+# comparison orders them, so ORDER BY rank, id is a range of the
+# (parent, rank, id) index, and a move writes one row: the new key sits
+# between its neighbours' keys, however many rows there are.
+#
+# New rows append RANK_STEP apart at RANK_WIDTH digits. Moves halve the gap,
+# so keys grow about one digit per five moves into the same spot; a move that
+# produces a key longer than RANK_REBALANCE_LEN queues a background rebalance
+# that rewrites the parent's keys evenly spaced again. That only runs after the
+# commit, on one thread, so a burst of moves can outpace it; a key that would
+# pass RANK_MAX_LEN is never written: the move re-spaces the parent itself first.
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import and_, event, func, or_, select, update
+from models import db, Task, Subtask
+from utils.changes import emit, subtasks_changed, tasks_changed
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"  # one case: same order under any collation
+BASE = len(DIGITS)
+RANK_WIDTH = 6
+RANK_SPACE = BASE ** RANK_WIDTH
+RANK_STEP = BASE ** 2
+RANK_MAX_LEN = 48  # well inside the String(64) rank column
+
+log = logging.getLogger("app.ranks")
+
+# model -> the column its order is scoped to
+PARENTS = {Task: Task.project_id, Subtask: Subtask.task_id}
+
+
+# ---------- keys ----------
+
+def encode(n: int) -> str:
+    # 0 < n < RANK_SPACE -> RANK_WIDTH digits, trailing zeros dropped
+    digits = []
+    for _ in range(RANK_WIDTH):
+        n, d = divmod(n, BASE)
+        digits.append(DIGITS[d])
+    return "".join(reversed(digits)).rstrip("0")
+
+
+def between(lo, hi) -> str:
+    # a key strictly between lo and hi; None = open end (start / end of the list)
+    lo = lo or ""
+    if hi is not None:
+        n = 0
+        while n < len(hi) and (lo[n] if n < len(lo) else "0") == hi[n]:
+            n += 1
+        if n:
+            return hi[:n] + between(lo[n:], hi[n:])
+    d_lo = DIGITS.index(lo[0]) if lo else 0
+    d_hi = DIGITS.index(hi[0]) if hi is not None else BASE
+    if d_hi - d_lo > 1:
+        return DIGITS[(d_lo + d_hi) // 2]
+    if hi is not None and len(hi) > 1:
+        return hi[0]
+    return DIGITS[d_lo] + between(lo[1:], None)
+
+
+def after(last) -> str:
+    # key for a row appended after `last` (None: the list is empty)
+    if last is None:
+        return encode(RANK_SPACE // 2)  # the middle: leaves as much room above as below
+    head = last[:RANK_WIDTH].ljust(RANK_WIDTH, "0")
+    n = int(head, BASE) + RANK_STEP
+    return encode(n) if n < RANK_SPACE else between(last, None)
+
+
+def spread(count: int) -> list:
+    # `count` keys RANK_STEP apart like appends (closer only for huge lists),
+    # centred so there is room at both ends
+    step = min(RANK_STEP, RANK_SPACE // (count + 1))
+    start = (RANK_SPACE - step * (count - 1)) // 2
+    return [encode(start + step * i) for i in range(count)]
+
+
+# ---------- rows ----------
+
+class Appender:
+    # ranks for rows inserted at the end of their parent's list; one MAX(rank)
+    # (the last entry of the index) per parent, then counted on in memory
+    def __init__(self, model):
+        self.model = model
+        self.parent = PARENTS[model]
+        self.last = {}
+
+    def empty(self, parent_id: int):
+        # a parent created in this batch: nothing to look up
+        self.last[parent_id] = None
+
+    def next(self, parent_id: int) -> str:
+        if parent_id not in self.last:
+            self.last[parent_id] = db.session.scalar(
+                select(func.max(self.model.rank)).where(self.parent == parent_id)
+            )
+        key = self.last[parent_id] = after(self.last[parent_id])
+        rebalancer.check(self.model, parent_id, key)
+        return key
+
+
+def _neighbour(model, parent_id, rank, row_id, moving_id, forward: bool):
+    # rank of the row right after (forward) / before (rank, row_id), skipping the one being moved
+    parent = PARENTS[model]
+    q = select(model.rank).where(parent == parent_id, model.id != moving_id)
+    if forward:
+        q = q.where(or_(model.rank > rank, and_(model.rank == rank, model.id > row_id)))
+        q = q.order_by(model.rank.asc(), model.id.asc())
+    else:
+        q = q.where(or_(model.rank < rank, and_(model.rank == rank, model.id < row_id)))
+        q = q.order_by(model.rank.desc(), model.id.desc())
+    return db.session.scalar(q.limit(1))
+
+
+def _end(model, parent_id, moving_id, first: bool):
+    parent = PARENTS[model]
+    agg = func.min if first else func.max
+    return db.session.scalar(select(agg(model.rank)).where(parent == parent_id, model.id != moving_id))
+
+
+def gap(model, parent_id, moving_id, anchor=None, after_anchor=True):
+    # (lo, hi) keys to place `moving_id` right after / before the anchor row; with
+    # no anchor, at the very start (after_anchor) or the very end (not after_anchor)
+    if anchor is None:
+        if after_anchor:
+            return None, _end(model, parent_id, moving_id, first=True)
+        return _end(model, parent_id, moving_id, first=False), None
+    if after_anchor:
+        return anchor.rank, _neighbour(model, parent_id, anchor.rank, anchor.id, moving_id, forward=True)
+    return _neighbour(model, parent_id, anchor.rank, anchor.id, moving_id, forward=False), anchor.rank
+
+
+def place(model, parent_id: int, moving_id: int, anchor_id=None, after_anchor=True):
+    # -> (new key for a move (see gap()), whether the parent's other keys were
+    # rewritten too); LookupError if the anchor is not a sibling. Reads two
+    # index entries, and the caller writes the one row.
+    anchor = None
+    if anchor_id is not None:
+        anchor = db.session.execute(
+            select(model.id, model.rank).where(model.id == anchor_id, PARENTS[model] == parent_id)
+        ).first()
+        if anchor is None:
+            raise LookupError(anchor_id)
+    lo, hi = gap(model, parent_id, moving_id, anchor, after_anchor)
+    if lo is not None and hi is not None and lo >= hi:
+        # equal keys (two appends raced for the same MAX): spread them out, look again
+        rebalance(model, parent_id)
+        return place(model, parent_id, moving_id, anchor_id, after_anchor)[0], True
+    key = between(lo, hi)
+    if len(key) > RANK_MAX_LEN:
+        # the background rebalance hasn't caught up with this gap: don't wait for it
+        rebalance(model, parent_id)
+        return place(model, parent_id, moving_id, anchor_id, after_anchor)[0], True
+    rebalancer.check(model, parent_id, key)
+    return key, False
+
+
+def placement(data):
+    # move body -> (anchor id, after_anchor); ValueError on anything else.
+    # {"after_id": n} right after n (null: first), {"before_id": n} right before n (null: last)
+    if not isinstance(data, dict) or ("after_id" in data) == ("before_id" in data):
+        raise ValueError("give exactly one of after_id or before_id")
+    after_anchor = "after_id" in data
+    raw = data["after_id" if after_anchor else "before_id"]
+    if raw is None:
+        return None, after_anchor
+    if isinstance(raw, bool) or not isinstance(raw, int):
+        raise ValueError("after_id / before_id must be an id or null")
+    return raw, after_anchor
+
+
+def rebalance(model, parent_id: int) -> int:
+    # rewrite a parent's keys evenly spaced, same order; the caller commits
+    parent = PARENTS[model]
+    ids = db.session.scalars(
+        select(model.id).where(parent == parent_id).order_by(model.rank.asc(), model.id.asc())
+    ).all()
+    if ids:
+        db.session.execute(update(model), [{"id": i, "rank": k} for i, k in zip(ids, spread(len(ids)))])
+    return len(ids)
+
+
+# ---------- background rebalancing ----------
+
+class Rebalancer:
+    def __init__(self):
+        self.app = None
+        self.max_len = 16
+        self._pool = None
+
+    def init_app(self, app):
+        app.config.setdefault("RANK_REBALANCE_LEN", 16)
+        self.app = app
+        self.max_len = int(app.config["RANK_REBALANCE_LEN"])
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ranks")
+        app.extensions["ranks"] = self
+
+    def check(self, model, parent_id: int, key: str):
+        # queue a rebalance (after the caller commits) once keys get this long
+        if len(key) > self.max_len:
+            db.session.info.setdefault("rebalance", set()).add((model.__name__, parent_id))
+
+    def submit(self, model_name: str, parent_id: int):
+        self._pool.submit(self._run, model_name, parent_id)
+
+    def _run(self, model_name: str, parent_id: int):
+        with self.app.app_context():
+            try:
+                if model_name == "Task":
+                    tasks_changed(parent_id)  # locks the project row first, as moves do
+                    rebalance(Task, parent_id)
+                    emit(parent_id, "tasks.reordered", [])  # every key changed: clients refetch
+                else:
+                    project_id = db.session.scalar(select(Task.project_id).where(Task.id == parent_id))
+                    if project_id is None:
+                        return
+                    subtasks_changed((parent_id, project_id))
+                    rebalance(Subtask, parent_id)
+                    emit(project_id, "subtasks.reordered", [{"task_id": parent_id}])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                log.exception("rank rebalance of %s %s failed", model_name, parent_id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _start_rebalances(session):
+    for model_name, parent_id in session.info.pop("rebalance", ()):
+        rebalancer.submit(model_name, parent_id)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_rebalances(session, previous_transaction):
+    session.info.pop("rebalance", None)
+
+
+rebalancer = Rebalancer()
@@ -0,0 +1,101 @@
+# utils/replicas.py
+# Optional read replicas. With DATABASE_REPLICA_URLS set, every replica is a
+# SQLALCHEMY_BINDS entry and GET/HEAD requests to the blueprints run their
+# queries on one of them; everything else, and any flush or DML statement even
+# inside a GET, goes to the primary.
+#
+# Replicas lag. A request that wrote sets a sticky-primary cookie for
+# REPLICA_LAG_TOLERANCE seconds, so the same client reads its own writes; the
+# read cache refuses to store results for a tag invalidated within that window
+# (a lagging replica would otherwise put the old rows back). Set the tolerance
+# above the replication lag you actually see.
+import random
+import sqlite3
+import time
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+STICKY_COOKIE = "db_primary_until"
+
+
+class RoutingSession(Session):
+    # session.info["replica"] = bind key for reads, set per request by Replicas;
+    # bind_arguments={"primary": True} forces the primary for one statement
+    def get_bind(self, mapper=None, clause=None, bind=None, primary=False, **kw):
+        key = self.info.get("replica")
+        if key is not None and bind is None and not primary:
+            if not (self._flushing or _is_write(clause)):
+                return self._db.engines[key]
+            self.info["wrote"] = True  # a write inside a GET: make the client sticky too
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kw)
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return isinstance(clause, UpdateBase)
+
+
+class Replicas:
+    def __init__(self):
+        self.keys = []
+        self.tolerance = 5.0
+
+    def init_app(self, app, db):
+        app.config.setdefault("DATABASE_REPLICA_URLS", "")
+        app.config.setdefault("REPLICA_LAG_TOLERANCE", 5.0)
+        self.db = db
+        self.tolerance = float(app.config["REPLICA_LAG_TOLERANCE"])
+        urls = [u.strip() for u in app.config["DATABASE_REPLICA_URLS"].split(",") if u.strip()]
+        self.keys = [f"replica{n}" for n in range(len(urls))]
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        for key, url in zip(self.keys, urls):
+            binds[key] = url.replace("postgres://", "postgresql://", 1)
+        app.extensions["replicas"] = self
+        if self.keys:
+            app.before_request(self._route)
+            app.after_request(self._stick)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keys)
+
+    def _route(self):
+        if request.method not in ("GET", "HEAD") or request.blueprint is None:
+            return
+        until = request.cookies.get(STICKY_COOKIE, type=float)
+        if until and until > time.time():
+            return  # this client wrote recently: read it back from the primary
+        self.db.session.info["replica"] = random.choice(self.keys)
+
+    def _stick(self, response):
+        if self.db.session.info.pop("wrote", False) or request.method not in ("GET", "HEAD", "OPTIONS"):
+            until = time.time() + self.tolerance
+            response.set_cookie(STICKY_COOKIE, f"{until:.3f}", max_age=int(self.tolerance) + 1,
+                                httponly=True, samesite="Lax")
+        return response
+
+    def sync_sqlite(self) -> list:
+        # local testing: copy the primary SQLite file over each replica file
+        primary = self.db.engine.url
+        if primary.get_backend_name() != "sqlite":
+            raise RuntimeError("replica-sync only copies SQLite databases")
+        copied = []
+        for key in self.keys:
+            engine = self.db.engines[key]
+            if engine.url.get_backend_name() != "sqlite":
+                continue
+            engine.dispose()
+            src, dst = sqlite3.connect(primary.database), sqlite3.connect(engine.url.database)
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+            copied.append(engine.url.database)
+        return copied
+
+
+replicas = Replicas()
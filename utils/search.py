@@ -0,0 +1,255 @@
+# utils/search.py
+# Full-text index over projects, tasks and subtasks. SQLite gets an FTS5
+# virtual table, Postgres a table with a generated tsvector + GIN index. In both
+# cases database triggers keep the index in step with every write path (single
+# handlers, /bulk statements, imports and FK cascades alike), so the routes
+# never have to remember to update it.
+#
+# Each document's key is ref_id * 4 + kind code (project 1, task 2, subtask 3),
+# which lets the triggers touch exactly one index row by primary key / rowid.
+import html
+import re
+from sqlalchemy import inspect, text
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE search_index USING fts5(
+        title, body, kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, owner_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    # projects
+    """CREATE TRIGGER search_projects_ai AFTER INSERT ON projects BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, project_id, owner_id)
+        VALUES (NEW.id * 4 + 1, NEW.title, NEW.description, 'project', NEW.id, NEW.id, NEW.owner_id);
+    END""",
+    """CREATE TRIGGER search_projects_au AFTER UPDATE OF title, description ON projects BEGIN
+        UPDATE search_index SET title = NEW.title, body = NEW.description WHERE rowid = NEW.id * 4 + 1;
+    END""",
+    """CREATE TRIGGER search_projects_owner AFTER UPDATE OF owner_id ON projects BEGIN
+        UPDATE search_index SET owner_id = NEW.owner_id WHERE project_id = NEW.id;
+    END""",
+    """CREATE TRIGGER search_projects_ad AFTER DELETE ON projects BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+    END""",
+    # tasks
+    """CREATE TRIGGER search_tasks_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, project_id, owner_id)
+        VALUES (NEW.id * 4 + 2, NEW.title, '', 'task', NEW.id, NEW.project_id,
+                (SELECT owner_id FROM projects WHERE id = NEW.project_id));
+    END""",
+    """CREATE TRIGGER search_tasks_au AFTER UPDATE OF title ON tasks BEGIN
+        UPDATE search_index SET title = NEW.title WHERE rowid = NEW.id * 4 + 2;
+    END""",
+    """CREATE TRIGGER search_tasks_ad AFTER DELETE ON tasks BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+    END""",
+    # subtasks
+    """CREATE TRIGGER search_subtasks_ai AFTER INSERT ON subtasks BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, project_id, owner_id)
+        SELECT NEW.id * 4 + 3, NEW.title, '', 'subtask', NEW.id, t.project_id, p.owner_id
+        FROM tasks t JOIN projects p ON p.id = t.project_id WHERE t.id = NEW.task_id;
+    END""",
+    """CREATE TRIGGER search_subtasks_au AFTER UPDATE OF title ON subtasks BEGIN
+        UPDATE search_index SET title = NEW.title WHERE rowid = NEW.id * 4 + 3;
+    END""",
+    """CREATE TRIGGER search_subtasks_ad AFTER DELETE ON subtasks BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+    END""",
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM search_index",
+    """INSERT INTO search_index(rowid, title, body, kind, ref_id, project_id, owner_id)
+       SELECT id * 4 + 1, title, description, 'project', id, id, owner_id FROM projects""",
+    """INSERT INTO search_index(rowid, title, body, kind, ref_id, project_id, owner_id)
+       SELECT t.id * 4 + 2, t.title, '', 'task', t.id, t.project_id, p.owner_id
+       FROM tasks t JOIN projects p ON p.id = t.project_id""",
+    """INSERT INTO search_index(rowid, title, body, kind, ref_id, project_id, owner_id)
+       SELECT s.id * 4 + 3, s.title, '', 'subtask', s.id, t.project_id, p.owner_id
+       FROM subtasks s JOIN tasks t ON t.id = s.task_id JOIN projects p ON p.id = t.project_id""",
+]
+
+# matches come back wrapped in these control characters, not in tags: the stored
+# text is escaped first and only then do they become <mark>...</mark> (marked())
+MARK_START, MARK_END = "\x02", "\x03"
+
+# soft-deleted projects (utils/purge.py) keep their index rows until the purge reaches them
+LIVE = "project_id NOT IN (SELECT id FROM projects WHERE owner_id = :owner_id AND deleted_at IS NOT NULL)"
+
+SQLITE_QUERY = f"""
+    SELECT kind, ref_id, project_id,
+           highlight(search_index, 0, char(2), char(3)) AS title,
+           snippet(search_index, 1, char(2), char(3), '…', 12) AS snippet,
+           bm25(search_index, 10.0, 1.0) AS rank
+    FROM search_index
+    WHERE search_index MATCH :q AND owner_id = :owner_id AND {LIVE}
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+SQLITE_COUNT = f"SELECT COUNT(*) FROM search_index WHERE search_index MATCH :q AND owner_id = :owner_id AND {LIVE}"
+
+PG_DDL = [
+    """CREATE TABLE search_documents (
+        doc_key BIGINT PRIMARY KEY,
+        kind VARCHAR(10) NOT NULL,
+        ref_id INTEGER NOT NULL,
+        project_id INTEGER NOT NULL,
+        owner_id INTEGER NOT NULL,
+        title TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        tsv TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+        ) STORED
+    )""",
+    "CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (tsv)",
+    "CREATE INDEX ix_search_documents_owner ON search_documents (owner_id)",
+    "CREATE INDEX ix_search_documents_project ON search_documents (project_id)",
+    """CREATE FUNCTION search_sync() RETURNS trigger AS $$
+    DECLARE
+        code INTEGER := CASE TG_TABLE_NAME WHEN 'projects' THEN 1 WHEN 'tasks' THEN 2 ELSE 3 END;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM search_documents WHERE doc_key = OLD.id::bigint * 4 + code;
+            RETURN OLD;
+        END IF;
+        IF TG_TABLE_NAME = 'projects' THEN
+            INSERT INTO search_documents (doc_key, kind, ref_id, project_id, owner_id, title, body)
+            VALUES (NEW.id::bigint * 4 + 1, 'project', NEW.id, NEW.id, NEW.owner_id, NEW.title, coalesce(NEW.description, ''))
+            ON CONFLICT (doc_key) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, owner_id = EXCLUDED.owner_id;
+            UPDATE search_documents SET owner_id = NEW.owner_id WHERE project_id = NEW.id AND owner_id <> NEW.owner_id;
+        ELSIF TG_TABLE_NAME = 'tasks' THEN
+            INSERT INTO search_documents (doc_key, kind, ref_id, project_id, owner_id, title)
+            SELECT NEW.id::bigint * 4 + 2, 'task', NEW.id, NEW.project_id, p.owner_id, NEW.title
+            FROM projects p WHERE p.id = NEW.project_id
+            ON CONFLICT (doc_key) DO UPDATE SET title = EXCLUDED.title;
+        ELSE
+            INSERT INTO search_documents (doc_key, kind, ref_id, project_id, owner_id, title)
+            SELECT NEW.id::bigint * 4 + 3, 'subtask', NEW.id, t.project_id, p.owner_id, NEW.title
+            FROM tasks t JOIN projects p ON p.id = t.project_id WHERE t.id = NEW.task_id
+            ON CONFLICT (doc_key) DO UPDATE SET title = EXCLUDED.title;
+        END IF;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER search_projects AFTER INSERT OR UPDATE OF title, description, owner_id OR DELETE
+       ON projects FOR EACH ROW EXECUTE FUNCTION search_sync()""",
+    """CREATE TRIGGER search_tasks AFTER INSERT OR UPDATE OF title OR DELETE
+       ON tasks FOR EACH ROW EXECUTE FUNCTION search_sync()""",
+    """CREATE TRIGGER search_subtasks AFTER INSERT OR UPDATE OF title OR DELETE
+       ON subtasks FOR EACH ROW EXECUTE FUNCTION search_sync()""",
+]
+
+PG_REBUILD = [
+    "DELETE FROM search_documents",
+    """INSERT INTO search_documents (doc_key, kind, ref_id, project_id, owner_id, title, body)
+       SELECT id::bigint * 4 + 1, 'project', id, id, owner_id, title, coalesce(description, '') FROM projects""",
+    """INSERT INTO search_documents (doc_key, kind, ref_id, project_id, owner_id, title)
+       SELECT t.id::bigint * 4 + 2, 'task', t.id, t.project_id, p.owner_id, t.title
+       FROM tasks t JOIN projects p ON p.id = t.project_id""",
+    """INSERT INTO search_documents (doc_key, kind, ref_id, project_id, owner_id, title)
+       SELECT s.id::bigint * 4 + 3, 'subtask', s.id, t.project_id, p.owner_id, s.title
+       FROM subtasks s JOIN tasks t ON t.id = s.task_id JOIN projects p ON p.id = t.project_id""",
+]
+
+PG_QUERY = f"""
+    SELECT kind, ref_id, project_id,
+           ts_headline('simple', title, q, 'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', HighlightAll=true') AS title,
+           ts_headline('simple', body, q, 'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords=12, MinWords=4') AS snippet,
+           -ts_rank(tsv, q) AS rank
+    FROM search_documents, to_tsquery('simple', :q) AS q
+    WHERE tsv @@ q AND owner_id = :owner_id AND {LIVE}
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+PG_COUNT = f"""
+    SELECT COUNT(*) FROM search_documents
+    WHERE tsv @@ to_tsquery('simple', :q) AND owner_id = :owner_id AND {LIVE}
+"""
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def install(engine):
+    # create the index + triggers if missing and fill it from the existing rows
+    table = "search_index" if _is_sqlite(engine) else "search_documents"
+    if engine.dialect.name not in ("sqlite", "postgresql"):
+        return
+    if inspect(engine).has_table(table):
+        return
+    with engine.begin() as conn:
+        for stmt in SQLITE_DDL if _is_sqlite(engine) else PG_DDL:
+            conn.exec_driver_sql(stmt)
+    rebuild(engine)
+
+
+def _sqlite_index(conn) -> bool:
+    return conn.dialect.name == "sqlite" and inspect(conn).has_table("search_index")
+
+
+def drop_triggers(conn):
+    # SQLite migrations that change a column type rebuild the table
+    # (batch_alter_table), and its rename step fails while other tables' triggers
+    # still reference it; drop them around the rebuild and restore_triggers() after
+    if _sqlite_index(conn):
+        for stmt in SQLITE_DDL[1:]:
+            name = re.match(r"CREATE TRIGGER (\w+)", stmt).group(1)
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def restore_triggers(conn):
+    if _sqlite_index(conn):
+        for stmt in SQLITE_DDL[1:]:
+            conn.exec_driver_sql(stmt.replace("CREATE TRIGGER", "CREATE TRIGGER IF NOT EXISTS", 1))
+
+
+def rebuild(engine):
+    with engine.begin() as conn:
+        for stmt in SQLITE_REBUILD if _is_sqlite(engine) else PG_REBUILD:
+            conn.exec_driver_sql(stmt)
+
+
+def match_expression(raw: str, sqlite: bool):
+    # user text -> prefix-match every word; quoting keeps FTS operators/syntax inert
+    words = re.findall(r"\w+", raw or "")
+    if not words:
+        return None
+    if sqlite:
+        return " ".join(f'"{w}"*' for w in words)
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def marked(fragment: str) -> str:
+    # highlighted text -> HTML: escape what the user stored, then tag the matches
+    return html.escape(fragment).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def search(session, owner_id: int, raw: str, page=1, per_page=10):
+    bind = session.get_bind()
+    sqlite = _is_sqlite(bind)
+    q = match_expression(raw, sqlite)
+    if q is None:
+        return None
+    params = {"q": q, "owner_id": owner_id, "limit": per_page, "offset": (page - 1) * per_page}
+    total = session.execute(text(SQLITE_COUNT if sqlite else PG_COUNT), params).scalar()
+    rows = session.execute(text(SQLITE_QUERY if sqlite else PG_QUERY), params).mappings()
+    data = [
+        {
+            "kind": r["kind"],
+            "id": r["ref_id"],
+            "project_id": r["project_id"],
+            "title": marked(r["title"] or ""),
+            "snippet": marked(r["snippet"] or ""),
+            "score": round(-float(r["rank"]), 6),
+        }
+        for r in rows
+    ]
+    return {
+        "data": data,
+        "meta": {
+            "page": page,
+            "pages": (total + per_page - 1) // per_page,
+            "total": total,
+            "per_page": per_page,
+        },
+    }
@@ -0,0 +1,109 @@
+# utils/sync.py
+# Delta feed behind GET /sync. Projects, tasks and subtasks carry updated_at
+# and deletes leave a Tombstone, each with an (owner_id, <timestamp>, id) index,
+# so "what changed since the cursor" is one UNION ALL of four index ranges
+# ordered by (ts, kind, id). The rows themselves are then loaded by primary key.
+#
+# Timestamps are taken when a row is written, not when its transaction commits,
+# so a slow writer can land rows slightly in the past. The cursor handed back
+# therefore never moves past `now - SETTLE`; rows in that window are sent again
+# on the next call (applying them twice is harmless for a replica). Writers
+# whose transaction can outlast SETTLE (the batched import) stamp their rows
+# again just before they commit (utils/importer.py).
+import base64
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, literal, or_, select, true, union_all
+from models import db, Project, Task, Subtask, Tombstone, purging_projects
+from utils.pagination import InvalidCursor
+
+SETTLE = timedelta(seconds=2)
+FEEDS = (
+    # kind, model, timestamp column; kinds sort in this order within one timestamp
+    ("deleted", Tombstone, Tombstone.deleted_at),
+    ("project", Project, Project.updated_at),
+    ("subtask", Subtask, Subtask.updated_at),
+    ("task", Task, Task.updated_at),
+)
+
+
+class CursorExpired(ValueError):
+    pass
+
+
+def _live(model, owner_id):
+    # a soft-deleted project already has its tombstone; its rows wait for the purge
+    purging = purging_projects(owner_id)
+    if model is Project:
+        return Project.deleted_at.is_(None)
+    if model is Task:
+        return Task.project_id.not_in(purging)
+    if model is Subtask:
+        return Subtask.task_id.not_in(select(Task.id).where(Task.project_id.in_(purging)))
+    return true()
+
+
+def encode_cursor(ts: datetime, kind: str, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), kind, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        ts, kind, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(ts), str(kind), int(row_id)
+    except Exception as e:
+        raise InvalidCursor("malformed cursor") from e
+
+
+def changes_since(owner_id: int, cursor=None, limit=500, retention=None) -> dict:
+    now = datetime.utcnow()
+    since = decode_cursor(cursor) if cursor else (datetime.min, "", 0)
+    if cursor and retention and since[0] < now - retention:
+        # tombstones this old may have been purged: the client has to start over
+        raise CursorExpired("cursor expired")
+    ts, kind, row_id = since
+
+    branches = [
+        select(literal(name).label("kind"), model.id.label("id"), col.label("ts"))
+        .where(model.owner_id == owner_id, col >= ts, _live(model, owner_id))
+        for name, model, col in FEEDS
+    ]
+    u = union_all(*branches).subquery()
+    keys = db.session.execute(
+        select(u.c.kind, u.c.id, u.c.ts)
+        .where(or_(u.c.ts > ts, and_(u.c.ts == ts, or_(u.c.kind > kind, and_(u.c.kind == kind, u.c.id > row_id)))))
+        .order_by(u.c.ts, u.c.kind, u.c.id)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+    ids = {name: [k.id for k in keys if k.kind == name] for name, _, _ in FEEDS}
+    rows = {}
+    for name, model, _ in FEEDS:
+        found = model.query.filter(model.id.in_(ids[name])).all() if ids[name] else []
+        rows[name] = sorted((r.to_dict() for r in found), key=lambda d: d["id"])
+
+    if keys:
+        last = keys[-1]
+        position = (last.ts, last.kind, last.id)
+        horizon = now - SETTLE
+        if not has_more and position[0] > horizon:
+            position = max((horizon, "", 0), since)
+    else:
+        position = max((now - SETTLE, "", 0), since) if cursor else (now - SETTLE, "", 0)
+    return {
+        "projects": rows["project"],
+        "tasks": rows["task"],
+        "subtasks": rows["subtask"],
+        "deleted": rows["deleted"],
+        "cursor": encode_cursor(*position),
+        "has_more": has_more,
+    }
+
+
+def purge_tombstones(older_than: timedelta) -> int:
+    result = db.session.execute(delete(Tombstone).where(Tombstone.deleted_at < datetime.utcnow() - older_than))
+    db.session.commit()
+    return result.rowcount